@@ -0,0 +1,404 @@
+"""
+Benchmark & load test untuk bot2jam.py.
+
+Menjalankan Bot API tiruan (aiohttp) di localhost, lalu mengirim update
+sintetis ke handle_webhook untuk ribuan chat: /start, pilih & aktifkan
+section, burst toggle done_, dan badai reminder pada menit yang sama.
+
+Contoh:
+    python bench_bot2jam.py --chats 2000 --toggles 6
+    python bench_bot2jam.py --chats 2000 --save baseline.json
+    python bench_bot2jam.py --chats 2000 --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from aiohttp import web, ClientSession
+
+BENCH_TOKEN = "123456:BENCH"
+BENCH_SECRET = "bench-secret"
+
+
+# -------------------------------------------------
+# Bot API tiruan
+# -------------------------------------------------
+class FakeBotApi:
+    """Meniru endpoint Bot API yang dipakai bot; mencatat jumlah panggilan & byte."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = {}
+        self.bytes_in = {}
+        self.send_times = []  # (waktu monotonic, chat_id) untuk setiap sendMessage
+        self._message_ids = itertools.count(1)
+
+    def _message(self, payload):
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(payload.get("chat_id", 0)), "type": "group"},
+            "text": payload.get("text", ""),
+        }
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        body = await request.read()
+        self.calls[method] = self.calls.get(method, 0) + 1
+        self.bytes_in[method] = self.bytes_in.get(method, 0) + len(body)
+        if request.content_type == "application/json":
+            payload = json.loads(body or b"{}")
+        else:
+            payload = dict(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                      "can_join_groups": True, "can_read_all_group_messages": False,
+                      "supports_inline_queries": False}
+        elif method == "sendMessage":
+            self.send_times.append((time.monotonic(), int(payload.get("chat_id", 0))))
+            result = self._message(payload)
+        elif method == "editMessageText":
+            result = self._message(payload)
+        elif method == "getUpdates":
+            result = []
+        else:
+            # answerCallbackQuery, setWebhook, deleteWebhook, ...
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.add_routes([web.route("*", "/bot{token}/{method}", self.handle)])
+        return app
+
+
+# -------------------------------------------------
+# Generator update sintetis
+# -------------------------------------------------
+class UpdateFactory:
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._ids = itertools.count(1)
+
+    def _base(self, chat_id):
+        return {
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"ops-{chat_id}"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "op"},
+        }
+
+    def command(self, chat_id, text):
+        base = self._base(chat_id)
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._ids),
+                "date": int(time.time()),
+                "chat": base["chat"],
+                "from": base["from"],
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+            },
+        }
+
+    def callback(self, chat_id, data):
+        base = self._base(chat_id)
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._ids)),
+                "from": base["from"],
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {
+                    "message_id": chat_id,
+                    "date": int(time.time()),
+                    "chat": base["chat"],
+                    "text": "jadwal",
+                },
+            },
+        }
+
+
+# -------------------------------------------------
+# Statistik
+# -------------------------------------------------
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def deep_sizeof(obj, seen=None):
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def wrap_handlers(application, samples):
+    """Catat durasi tiap callback handler secara presisi (bukan per bucket histogram)."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            name = getattr(handler.callback, "__name__", "handler")
+            callback = handler.callback
+
+            async def timed(update, context, _callback=callback, _name=name):
+                started = time.perf_counter()
+                try:
+                    return await _callback(update, context)
+                finally:
+                    samples.setdefault(_name, []).append(time.perf_counter() - started)
+
+            handler.callback = timed
+
+
+# -------------------------------------------------
+# Skenario
+# -------------------------------------------------
+async def post_updates(session, url, updates, concurrency, duplicate_ratio):
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": BENCH_SECRET, "Content-Type": "application/json"}
+    statuses = {}
+
+    async def post(update):
+        async with semaphore:
+            body = json.dumps(update)
+            for _ in range(2 if random.random() < duplicate_ratio else 1):
+                async with session.post(url, data=body, headers=headers) as response:
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    await asyncio.gather(*(post(update) for update in updates))
+    return statuses
+
+
+async def wait_idle(application, bot2jam, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if application.update_queue.qsize() == 0 and not bot2jam._enqueued_at \
+                and not bot2jam.edit_coalescer._pending:
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError("update_queue tidak kosong setelah batas waktu")
+
+
+async def run_phase(name, application, bot2jam, session, url, updates, args, report):
+    started = time.perf_counter()
+    statuses = await post_updates(session, url, updates, args.concurrency, args.duplicates)
+    await wait_idle(application, bot2jam)
+    elapsed = time.perf_counter() - started
+    report["phases"][name] = {
+        "updates": len(updates),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(updates) / elapsed, 1) if elapsed else 0.0,
+        "http_status": statuses,
+    }
+
+
+async def run(args):
+    random.seed(args.seed)
+    fake = FakeBotApi(latency=args.api_latency / 1000)
+    fake_runner = web.AppRunner(fake.app(), access_log=None)
+    await fake_runner.setup()
+    fake_site = web.TCPSite(fake_runner, "127.0.0.1", 0)
+    await fake_site.start()
+    api_port = fake_site._server.sockets[0].getsockname()[1]
+
+    workdir = tempfile.mkdtemp(prefix="bot2jam-bench-")
+    os.environ.update({
+        "TOKEN": BENCH_TOKEN,
+        "WEBHOOK_SECRET": BENCH_SECRET,
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{api_port}/bot",
+        "PERSISTENCE_FILE": os.path.join(workdir, "bench.sqlite3"),
+        "PERSISTENCE_INTERVAL": "3600",
+        "SEND_GLOBAL_RATE": str(args.send_rate),
+        "UPDATE_QUEUE_MAXSIZE": str(args.queue_size),
+    })
+    os.chdir(workdir)
+    import logging
+    logging.disable(logging.WARNING)
+    import bot2jam
+
+    application = bot2jam.build_application()
+    samples = {}
+    wrap_handlers(application, samples)
+    await bot2jam.start_bot(application)
+    web_app = bot2jam.build_web_app(application)
+    runner = web.AppRunner(web_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    bot_port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{bot_port}{bot2jam.WEBHOOK_PATH}"
+
+    factory = UpdateFactory()
+    chats = [-100_000_000 - i for i in range(args.chats)]
+    sections = list(bot2jam.SECTION_ENTRIES)
+    report = {"config": vars(args), "phases": {}}
+    baseline_state = deep_sizeof(application.bot_data) + deep_sizeof(bot2jam.reminder_registry)
+
+    async with ClientSession() as session:
+        await run_phase("start", application, bot2jam, session, url,
+                        [factory.command(chat, "/start") for chat in chats], args, report)
+
+        chosen = {chat: random.choice(sections) for chat in chats}
+        await run_phase("section_activate", application, bot2jam, session, url,
+                        [factory.callback(chat, f"section_{chosen[chat]}") for chat in chats]
+                        + [factory.callback(chat, f"activate_{chosen[chat]}") for chat in chats], args, report)
+
+        toggles = []
+        for chat in chats:
+            entries = bot2jam.SECTION_ENTRIES[chosen[chat]]
+            for entry in random.sample(entries, min(args.toggles, len(entries))):
+                toggles.append(factory.callback(chat, f"done_{chosen[chat]}_{entry.id}"))
+        random.shuffle(toggles)
+        await run_phase("done_burst", application, bot2jam, session, url, toggles, args, report)
+
+    # Badai reminder: jalankan timer dispatcher untuk menit tersibuk per section
+    busiest = sorted(bot2jam.minute_index, key=lambda k: -sum(len(v) for v in bot2jam.minute_index[k].values()))
+    storm_keys = busiest[:args.storm_minutes]
+    fake.send_times.clear()
+    storm_started = time.monotonic()
+    for key in storm_keys:
+        job = application.job_queue.get_jobs_by_name(f"dispatch_{key[0]:02d}{key[1]:02d}")[0]
+        # Timer dipicu di luar jadwalnya; lewati penanda menit yang sudah dikirim
+        application.bot_data.pop("last_dispatch", None)
+        await job.run(application)
+    while bot2jam.send_queue.qsize() or bot2jam.send_queue._pending:
+        await asyncio.sleep(0.01)
+    await bot2jam.send_queue._queue.join()
+    # Timer dipicu paksa, bukan pada jadwalnya: yang diukur adalah waktu sejak badai
+    # dimulai sampai tiap pesan terkirim (latensi pengurasan send_queue), bukan skew jadwal
+    drains = [sent - storm_started for sent, _ in fake.send_times]
+    report["reminder_storm"] = {
+        "minutes": [f"{h:02d}:{m:02d} UTC" for h, m in storm_keys],
+        "messages_sent": len(drains),
+        "drain_p50_s": round(percentile(drains, 0.5), 4),
+        "drain_p99_s": round(percentile(drains, 0.99), 4),
+        "drain_max_s": round(max(drains, default=0.0), 4),
+    }
+
+    # Latensi handler
+    report["handlers"] = {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        }
+        for name, values in sorted(samples.items())
+    }
+
+    # Memori state per chat
+    state_bytes = deep_sizeof(application.bot_data) + deep_sizeof(bot2jam.reminder_registry) - baseline_state
+    report["memory_bytes_per_chat"] = round(state_bytes / max(1, args.chats), 1)
+
+    # Volume tulis persistence untuk satu flush
+    rows_before, bytes_before = bot2jam.persistence.rows_written, bot2jam.persistence.bytes_written
+    await application.update_persistence()
+    await bot2jam.persistence.save_bot_data()
+    report["persistence"] = {
+        "rows_written": bot2jam.persistence.rows_written - rows_before,
+        "bytes_written": bot2jam.persistence.bytes_written - bytes_before,
+    }
+
+    report["bot_api_calls"] = dict(sorted(fake.calls.items()))
+    report["bot_api_bytes"] = dict(sorted(fake.bytes_in.items()))
+    report["render_cache"] = bot2jam.render_cache_info()._asdict()
+    report["ingest"] = {f"{source}.{event}": value for (source, event), value in bot2jam.ingest_stats.items()}
+
+    await bot2jam.send_queue.stop()
+    await application.stop()
+    await application.shutdown()
+    await runner.cleanup()
+    await fake_runner.cleanup()
+    return report
+
+
+# -------------------------------------------------
+# Perbandingan dengan baseline
+# -------------------------------------------------
+# (path metrik, True jika lebih besar = lebih buruk)
+REGRESSION_KEYS = [
+    (("phases", "start", "updates_per_second"), False),
+    (("phases", "done_burst", "updates_per_second"), False),
+    (("reminder_storm", "drain_p99_s"), True),
+    (("memory_bytes_per_chat",), True),
+    (("persistence", "bytes_written"), True),
+]
+
+
+def lookup(report, path):
+    for key in path:
+        report = report.get(key, {}) if isinstance(report, dict) else {}
+    return report if isinstance(report, (int, float)) else None
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for path, higher_is_worse in REGRESSION_KEYS + [
+        (("handlers", name, "p99_ms"), True) for name in baseline.get("handlers", {})
+    ]:
+        old, new = lookup(baseline, path), lookup(report, path)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if higher_is_worse else change < -tolerance
+        print(f"{'REGRESI' if worse else 'ok':8} {'.'.join(path):45} {old:>12} -> {new:<12} ({change:+.1%})")
+        if worse:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--toggles", type=int, default=6, help="jumlah toggle done_ per chat")
+    parser.add_argument("--storm-minutes", type=int, default=3, help="jumlah menit tersibuk yang dipicu")
+    parser.add_argument("--concurrency", type=int, default=64, help="request webhook paralel")
+    parser.add_argument("--duplicates", type=float, default=0.01, help="rasio update yang dikirim ulang")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="latensi tiruan Bot API (ms)")
+    parser.add_argument("--send-rate", type=float, default=1000.0,
+                        help="SEND_GLOBAL_RATE selama benchmark (30 = batas Telegram sebenarnya)")
+    parser.add_argument("--queue-size", type=int, default=100000, help="UPDATE_QUEUE_MAXSIZE")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="simpan hasil sebagai JSON")
+    parser.add_argument("--compare", help="bandingkan dengan baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    report = asyncio.run(run(args))
+    os.chdir(cwd)
+
+    print(json.dumps(report, indent=2, default=str))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,45 @@ import datetime
 import pytz
 import os
 import re
+import time
+import json
+import pickle
+import sqlite3
 import asyncio
-
-from aiohttp import web
+import dataclasses
+import functools
+import hmac
+import hashlib
+import bisect
+import collections
+import fcntl
+import signal
+import subprocess
+import sys
+import threading
+from typing import NamedTuple
+
+import httpx
+from aiohttp import web, ClientSession, ClientTimeout, ClientError, UnixConnector
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter, Forbidden, BadRequest, TelegramError
+from telegram.request import HTTPXRequest
+
+try:
+    # Decoder JSON cepat (opsional); jatuh kembali ke modul json standar
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     CallbackQueryHandler,
+    TypeHandler,
     ContextTypes,
-    PicklePersistence,
+    BasePersistence,
+    PersistenceInput,
 )
-from apscheduler.jobstores.base import JobLookupError  # Untuk menangani job yang sudah dihapus
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -26,11 +53,75 @@ TOKEN = os.environ.get("TOKEN") or "YOUR_BOT_TOKEN_HERE"
 WEBHOOK_PATH = f"/{TOKEN}"
 WEBHOOK_URL_BASE = os.environ.get("WEBHOOK_URL_BASE")
 WEBHOOK_URL = f"{WEBHOOK_URL_BASE}{WEBHOOK_PATH}" if WEBHOOK_URL_BASE else None
-
-persistence = PicklePersistence(filepath="reminder_data.pkl")
-user_jobs = {}  # Menyimpan daftar JobQueue per chat_id
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+# Bisa diarahkan ke Bot API server lokal / tiruan (mis. untuk benchmark)
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL")
+UPDATE_QUEUE_MAXSIZE = int(os.environ.get("UPDATE_QUEUE_MAXSIZE", 1000))
+UPDATE_DEDUP_WINDOW = int(os.environ.get("UPDATE_DEDUP_WINDOW", 4096))
+# "auto" = webhook jika WEBHOOK_URL_BASE diset, selain itu polling
+INGEST_MODE = os.environ.get("INGEST_MODE", "auto")
+POLL_TIMEOUT = int(os.environ.get("POLL_TIMEOUT", 50))
+POLL_BATCH_LIMIT = 100  # batas maksimum getUpdates dari Bot API
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+PERSISTENCE_FILE = os.environ.get("PERSISTENCE_FILE", "reminder_data.sqlite3")
+LEGACY_PICKLE_FILE = "reminder_data.pkl"
+PERSISTENCE_INTERVAL = float(os.environ.get("PERSISTENCE_INTERVAL", 60))
 timezone = pytz.timezone("Asia/Jakarta")
 
+# Index menit UTC -> {section: [ScheduleEntry, ...]}; satu timer JobQueue per kunci
+minute_index = {}
+# Menit-dalam-hari UTC (jam*60+menit) dari minute_index, terurut; untuk pencarian rentang dengan bisect
+dispatch_times = []
+
+# Batas kirim Telegram: ~30 pesan/detik global, 20 pesan/menit per grup
+SEND_GLOBAL_RATE = float(os.environ.get("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_PER_MINUTE = float(os.environ.get("SEND_CHAT_PER_MINUTE", 20))
+SEND_WORKERS = int(os.environ.get("SEND_WORKERS", 4))
+SEND_MAX_ATTEMPTS = 5
+# Pool koneksi HTTP ke Bot API; getUpdates memakai objek request & pool sendiri
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 32))
+HTTP_GET_UPDATES_POOL_SIZE = int(os.environ.get("HTTP_GET_UPDATES_POOL_SIZE", 2))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_KEEPALIVE_CONNECTIONS", 16))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 120))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+HTTP_WRITE_TIMEOUT = float(os.environ.get("HTTP_WRITE_TIMEOUT", 10))
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", 3))
+# Jumlah koneksi yang dibuka lebih dulu saat startup (0 = nonaktif)
+HTTP_PREWARM_CONNECTIONS = int(os.environ.get("HTTP_PREWARM_CONNECTIONS", SEND_WORKERS))
+RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", 1024))
+# Jumlah tombol entry per halaman keyboard section (0 = semua dalam satu halaman)
+KEYBOARD_PAGE_SIZE = int(os.environ.get("KEYBOARD_PAGE_SIZE", 10))
+# Tampilan awal keyboard hanya berisi entry yang belum selesai
+KEYBOARD_PENDING_ONLY = os.environ.get("KEYBOARD_PENDING_ONLY", "0") == "1"
+# Jendela penggabungan edit untuk tap ✅/❌ beruntun (detik)
+EDIT_DEBOUNCE = float(os.environ.get("EDIT_DEBOUNCE", 0.7))
+# Batas pergantian hari (waktu lokal); status ✅ dari hari sebelumnya otomatis dianggap kosong
+ROLLOVER_CUTOFF = os.environ.get("ROLLOVER_CUTOFF", "06:00")
+HISTORY_DAYS = int(os.environ.get("HISTORY_DAYS", 7))
+# Definisi jadwal eksternal (.json, .yaml/.yml, atau .sqlite3/.db); REMINDER_SECTIONS jadi cadangan
+SCHEDULE_FILE = os.environ.get("SCHEDULE_FILE", "schedules.json")
+SCHEDULE_POLL_INTERVAL = float(os.environ.get("SCHEDULE_POLL_INTERVAL", 10))
+# Nama section ikut di callback_data (maks. 64 byte, dipisah "_"), mis. "done_<section>_<id>_s_<hal>_1";
+# sisakan ruang untuk ID entry dan nomor halaman
+SECTION_NAME_MAX_BYTES = 40
+# Reminder yang terlewat (restart/stall) dikirim ulang sebagai ringkasan jika masih dalam jendela ini (menit)
+CATCHUP_GRACE_MINUTES = float(os.environ.get("CATCHUP_GRACE_MINUTES", 30))
+LOOP_WATCHDOG_INTERVAL = float(os.environ.get("LOOP_WATCHDOG_INTERVAL", 1))
+LOOP_STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD", 5))
+# Jumlah panggilan handler/job terakhir yang disimpan untuk /admin/slow
+SLOW_CALL_HISTORY = int(os.environ.get("SLOW_CALL_HISTORY", 1024))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+# Mode multi-proses: WORKERS > 1 menjalankan supervisor yang menyalakan N worker
+# (file ini dengan WORKER_INDEX=0..N-1) di port yang sama; update dibagi per chat_id
+WORKERS = int(os.environ.get("WORKERS", 1))
+WORKER_INDEX = os.environ.get("WORKER_INDEX")
+# Direktori lokal untuk Unix socket antar-worker dan file lock leader
+CLUSTER_DIR = os.environ.get("CLUSTER_DIR", f"{PERSISTENCE_FILE}.cluster")
+LEADER_RETRY_INTERVAL = float(os.environ.get("LEADER_RETRY_INTERVAL", 5))
+MESSAGE_MAX_LENGTH = 4096
+
 # -------------------------------------------------
 # Definisi jadwal pengingat (5 menit sebelum waktu target)
 # -------------------------------------------------
@@ -116,86 +207,1184 @@ REMINDER_SECTIONS = {
 }
 
 # -------------------------------------------------
-# Fungsi untuk mengirim pesan reminder
+# Registry ID entry: setiap entry punya ID numerik yang stabil per section
+# (posisi bit pada bitmask status selesai). Alokasi ID disimpan di
+# bot_data["entry_ids"] = {section: {pesan: id}} agar tetap sama setelah
+# jadwal diubah atau bot di-restart.
+# -------------------------------------------------
+MAX_ENTRY_BITS = 63  # bitmask disimpan sebagai INTEGER 64-bit bertanda di SQLite
+
+
+class ScheduleEntry(NamedTuple):
+    id: int
+    section: str
+    hour: int
+    minute: int
+    message: str
+
+
+def assign_entry_ids(sections: dict, id_map: dict) -> dict:
+    """
+    Lengkapi id_map untuk setiap pesan di sections. Pesan yang sudah dikenal
+    mempertahankan ID-nya; pesan baru memakai ID yang belum pernah dipakai,
+    dan baru memakai ulang ID entry yang sudah dihapus jika 63 bit habis.
+    """
+    for section, entries in sections.items():
+        ids = id_map.setdefault(section, {})
+        taken = set()
+        for _, _, message in entries:
+            entry_id = ids.get(message)
+            if entry_id is None or entry_id in taken:
+                ever_used = set(ids.values())
+                candidates = [i for i in range(MAX_ENTRY_BITS) if i not in ever_used]
+                if not candidates:
+                    candidates = [i for i in range(MAX_ENTRY_BITS) if i not in taken]
+                if not candidates:
+                    raise ValueError(f"Section {section} melebihi {MAX_ENTRY_BITS} entry")
+                entry_id = ids[message] = candidates[0]
+            taken.add(entry_id)
+    return id_map
+
+
+def build_entry_registry(sections: dict, id_map: dict) -> dict:
+    """Bangun {section: [ScheduleEntry, ...]} dari definisi (jam, menit, pesan)."""
+    return {
+        section: [ScheduleEntry(id_map[section][message], section, hour, minute, message)
+                  for hour, minute, message in entries]
+        for section, entries in sections.items()
+    }
+
+
+SECTION_ENTRIES = {}
+# (section, id) -> ScheduleEntry, untuk callback tombol done_
+ENTRY_BY_ID = {}
+# (section, pesan) -> ScheduleEntry, untuk migrasi state lama & tombol lama berbasis teks
+ENTRY_BY_MESSAGE = {}
+# Alokasi ID yang sedang berlaku (disalin ke bot_data["entry_ids"] saat startup/reload)
+ENTRY_IDS = {}
+# section -> [ScheduleEntry, ...] urut kronologis dalam satu hari kerja (mulai ROLLOVER_CUTOFF),
+# jadi 23:xx tetap sebelum 00:xx di Malam; SECTION_OFFSETS paralel untuk bisect
+SECTION_TIMELINE = {}
+SECTION_OFFSETS = {}
+
+
+def apply_schedule(sections: dict, id_map: dict = None):
+    """
+    Satu-satunya jalan untuk mengganti definisi jadwal: registry diperbarui
+    di tempat dan cache render dikosongkan agar tidak ada tampilan basi.
+    """
+    id_map = assign_entry_ids(sections, id_map if id_map is not None else {})
+    SECTION_ENTRIES.clear()
+    SECTION_ENTRIES.update(build_entry_registry(sections, id_map))
+    ENTRY_BY_ID.clear()
+    ENTRY_BY_ID.update({(e.section, e.id): e for entries in SECTION_ENTRIES.values() for e in entries})
+    ENTRY_BY_MESSAGE.clear()
+    ENTRY_BY_MESSAGE.update({(e.section, e.message): e for entries in SECTION_ENTRIES.values() for e in entries})
+    if id_map is not ENTRY_IDS:
+        ENTRY_IDS.clear()
+        ENTRY_IDS.update(id_map)
+    build_timeline()
+    _render_section_cached.cache_clear()
+
+
+# -------------------------------------------------
+# Generasi hari: status selesai disimpan sebagai (generasi, bitmask). Status
+# dengan generasi lama dianggap kosong, jadi pergantian hari tidak perlu
+# menyentuh data chat mana pun; arsip ke riwayat dilakukan saat ditulis ulang.
 # -------------------------------------------------
-async def reminder(context: ContextTypes.DEFAULT_TYPE):
-    data = context.job.data or {}
-    chat_id = data.get("chat_id")
-    message = data.get("message")
-    section = data.get("section")
-    thread_id = data.get("thread_id")
+_cutoff_hour, _cutoff_minute = (int(part) for part in ROLLOVER_CUTOFF.split(":"))
+_generation_cache = [0, 0.0]  # [generasi, berlaku sampai (epoch detik)]
+
+
+def current_generation() -> int:
+    """Nomor hari (ordinal tanggal lokal, digeser ROLLOVER_CUTOFF) yang sedang berjalan."""
+    if time.time() < _generation_cache[1]:
+        return _generation_cache[0]
+    now_local = datetime.datetime.now(timezone)
+    cutoff = now_local.replace(hour=_cutoff_hour, minute=_cutoff_minute, second=0, microsecond=0)
+    if now_local < cutoff:
+        day = now_local.date() - datetime.timedelta(days=1)
+    else:
+        day = now_local.date()
+        cutoff += datetime.timedelta(days=1)
+    _generation_cache[:] = [day.toordinal(), cutoff.timestamp()]
+    return _generation_cache[0]
+
+
+def generation_date(generation: int) -> datetime.date:
+    return datetime.date.fromordinal(generation)
+
+
+def day_offset(hour: int, minute: int) -> int:
+    """Menit sejak ROLLOVER_CUTOFF (0..1439); urutan ini sama dengan urutan generasi hari."""
+    return (hour * 60 + minute - (_cutoff_hour * 60 + _cutoff_minute)) % (24 * 60)
 
-    # Cek apakah pesan ini sudah ditandai selesai
-    completed_tasks = context.bot_data.get("completed_tasks", {}).get(chat_id, set())
-    if message in completed_tasks:
+
+def current_day_offset() -> int:
+    now_local = datetime.datetime.now(timezone)
+    return day_offset(now_local.hour, now_local.minute)
+
+
+def build_timeline():
+    """Urutkan entry tiap section sekali (saat jadwal diterapkan), bukan per render."""
+    SECTION_TIMELINE.clear()
+    SECTION_OFFSETS.clear()
+    for section, entries in SECTION_ENTRIES.items():
+        timeline = sorted(entries, key=lambda e: (day_offset(e.hour, e.minute), e.id))
+        SECTION_TIMELINE[section] = timeline
+        SECTION_OFFSETS[section] = [day_offset(e.hour, e.minute) for e in timeline]
+
+
+def upcoming_entries(bot_data: dict, chat_id: int, sections, offset: int, limit: int) -> list:
+    """
+    Entry belum selesai yang jatuh setelah `offset`, sebagai (menit lagi, ScheduleEntry)
+    urut waktu. Melewati akhir hari kerja berarti lanjut ke generasi berikutnya,
+    yang statusnya selalu masih kosong.
+    """
+    found = []
+    for section in sections:
+        offsets = SECTION_OFFSETS.get(section, [])
+        timeline = SECTION_TIMELINE.get(section, [])
+        mask = get_completed_mask(bot_data, chat_id, section)
+        start = bisect.bisect_right(offsets, offset)
+        taken = 0
+        for i in range(start, start + len(timeline)):
+            if taken >= limit:
+                break
+            wrapped = i >= len(timeline)
+            entry = timeline[i % len(timeline)]
+            if not wrapped and is_done(mask, entry):
+                continue
+            found.append((offsets[i % len(timeline)] - offset + (24 * 60 if wrapped else 0), entry))
+            taken += 1
+    found.sort(key=lambda item: (item[0], item[1].section, item[1].id))
+    return found[:limit]
+
+
+def overdue_entries(bot_data: dict, chat_id: int, section: str, offset: int) -> list:
+    """Entry hari ini yang waktunya sudah lewat (<= offset) tapi belum selesai, sebagai (menit lalu, entry)."""
+    mask = get_completed_mask(bot_data, chat_id, section)
+    offsets = SECTION_OFFSETS.get(section, [])
+    end = bisect.bisect_right(offsets, offset)
+    return [
+        (offset - entry_offset, entry)
+        for entry_offset, entry in zip(offsets[:end], SECTION_TIMELINE[section][:end])
+        if not is_done(mask, entry)
+    ]
+
+
+def get_completed_mask(bot_data: dict, chat_id: int, section: str) -> int:
+    state = bot_data.get("completed_tasks", {}).get(chat_id, {}).get(section)
+    if state is None or state[0] != current_generation():
+        return 0
+    return state[1]
+
+
+def set_completed_mask(bot_data: dict, chat_id: int, section: str, mask: int):
+    completed = bot_data.setdefault("completed_tasks", {}).setdefault(chat_id, {})
+    generation = current_generation()
+    previous = completed.get(section)
+    if previous is not None and previous[0] != generation:
+        archive_completion(bot_data, chat_id, section, previous)
+    if mask:
+        completed[section] = (generation, mask)
+    else:
+        completed.pop(section, None)
+
+
+def archive_completion(bot_data: dict, chat_id: int, section: str, state: tuple):
+    """Pindahkan (generasi, bitmask) hari lalu ke riwayat bergulir chat tsb."""
+    if not state[1]:
         return
+    history = bot_data.setdefault("completion_history", {}).setdefault(chat_id, {}).setdefault(section, [])
+    history.append(tuple(state))
+    history.sort()
+    del history[:-HISTORY_DAYS]
+
+
+def completion_history(bot_data: dict, chat_id: int, section: str) -> list:
+    """Riwayat [(generasi, bitmask), ...] hari-hari sebelumnya, terbaru lebih dulu."""
+    history = list(bot_data.get("completion_history", {}).get(chat_id, {}).get(section, []))
+    state = bot_data.get("completed_tasks", {}).get(chat_id, {}).get(section)
+    if state is not None and state[0] != current_generation():
+        # Status hari lalu yang belum sempat diarsipkan
+        history.append(tuple(state))
+    return sorted(history, reverse=True)[:HISTORY_DAYS]
+
+
+def is_done(mask: int, entry: ScheduleEntry) -> bool:
+    return bool(mask >> entry.id & 1)
+
+
+def messages_to_masks(messages) -> dict:
+    """Konversi set teks pesan (format completed_tasks lama) menjadi {section: bitmask}."""
+    masks = {}
+    for section in SECTION_ENTRIES:
+        for message in messages:
+            entry = ENTRY_BY_MESSAGE.get((section, message))
+            if entry:
+                masks[section] = masks.get(section, 0) | 1 << entry.id
+    return masks
+
+
+def normalize_completed_tasks(bot_data: dict):
+    """
+    Ubah completed_tasks format lama ({chat_id: set(pesan)} atau
+    {chat_id: {section: bitmask}}) menjadi {chat_id: {section: (generasi, bitmask)}}.
+    Status lama tanpa generasi dianggap milik hari ini.
+    """
+    completed_tasks = bot_data.get("completed_tasks", {})
+    generation = current_generation()
+    for chat_id, value in completed_tasks.items():
+        if isinstance(value, (set, frozenset, list)):
+            value = completed_tasks[chat_id] = messages_to_masks(value)
+        for section, state in value.items():
+            if isinstance(state, int):
+                value[section] = (generation, state)
+
+# -------------------------------------------------
+# Cache render: teks + keyboard per (section, bitmask selesai, jenis tampilan).
+# Objek telegram bersifat immutable sehingga aman dipakai bersama antar chat.
+# -------------------------------------------------
+VIEW_SECTION = "section"  # section_handler: tombol Aktifkan + daftar + Reset
+VIEW_ACTIVE = "aktif"     # /jadwalaktif: daftar + Reset <section>
+VIEW_TEXT = "text"        # /jadwalpagi dll: hanya teks
+# Kode tampilan di callback_data halaman: page_<section>_<kode>_<halaman>_<hanya belum selesai>
+VIEW_CODES = {VIEW_SECTION: "s", VIEW_ACTIVE: "a"}
+VIEW_BY_CODE = {code: view for view, code in VIEW_CODES.items()}
+
+
+def compact_label(entry: ScheduleEntry, mask: int) -> str:
+    """Label ringkas, mis. "❌ 07:05 cek link pc indo": awalan jam yang sama di teks pesan dibuang."""
+    status = "✅" if is_done(mask, entry) else "❌"
+    clock = f"{entry.hour:02d}:{entry.minute:02d}"
+    message = entry.message[len(clock) + 1:] if entry.message.startswith(clock + " ") else entry.message
+    return f"{status} {clock} {message}"
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_section_cached(section: str, mask: int, view: str, page: int, pending_only: bool):
+    header = f"📋 Jadwal *{section}* (Aktif):" if view == VIEW_ACTIVE else f"📋 Jadwal *{section}*:"
+    timeline = SECTION_TIMELINE[section]
+    if view == VIEW_TEXT:
+        return "\n".join([header] + [compact_label(entry, mask) for entry in timeline]), None
+
+    # Daftar entry hanya ada di tombol; teks cukup ringkasan progres
+    entries = [entry for entry in timeline if not is_done(mask, entry)] if pending_only else timeline
+    page_size = KEYBOARD_PAGE_SIZE or max(len(entries), 1)
+    pages = max(1, -(-len(entries) // page_size))
+    page = min(max(page, 0), pages - 1)
+    done = sum(1 for entry in timeline if is_done(mask, entry))
+    summary = f"✅ {done}/{len(timeline)} selesai"
+    if pages > 1:
+        summary += f" · halaman {page + 1}/{pages}"
+    lines = [header, summary]
+    if pending_only and not entries:
+        lines.append("🎉 Semua jadwal sudah selesai.")
+
+    code = VIEW_CODES[view]
+    state = f"{code}_{page}_{int(pending_only)}"
+    keyboard = []
+    if view == VIEW_SECTION:
+        keyboard.append([InlineKeyboardButton("✅ Aktifkan", callback_data=f"activate_{section}")])
+    for entry in entries[page * page_size:(page + 1) * page_size]:
+        # Tombol untuk toggle done/undone; membawa halaman & filter agar tampilan tetap sama
+        keyboard.append([InlineKeyboardButton(compact_label(entry, mask), callback_data=f"done_{section}_{entry.id}_{state}")])
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("◀️", callback_data=f"page_{section}_{code}_{page - 1}_{int(pending_only)}"))
+    nav.append(InlineKeyboardButton(
+        "👁 Semua" if pending_only else "🙈 Belum selesai",
+        callback_data=f"page_{section}_{code}_0_{int(not pending_only)}",
+    ))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton("▶️", callback_data=f"page_{section}_{code}_{page + 1}_{int(pending_only)}"))
+    keyboard.append(nav)
+
+    reset_label = f"❌ Reset {section}" if view == VIEW_ACTIVE else "❌ Reset"
+    keyboard.append([
+        InlineKeyboardButton(reset_label, callback_data=f"reset_{section}"),
+        InlineKeyboardButton("🔙 Kembali", callback_data="go_back"),
+    ])
+    return "\n".join(lines), InlineKeyboardMarkup(keyboard)
+
+
+def render_section(section: str, mask: int, view: str, page: int = 0, pending_only: bool = KEYBOARD_PENDING_ONLY):
+    """Kembalikan (teks, reply_markup) untuk satu section; reply_markup None untuk VIEW_TEXT."""
+    if view == VIEW_TEXT:
+        page, pending_only = 0, False
+    return _render_section_cached(section, mask, view, page, pending_only)
+
+
+def render_cache_info():
+    """Statistik cache render (hits, misses, maxsize, currsize)."""
+    return _render_section_cached.cache_info()
+
+
+apply_schedule(REMINDER_SECTIONS)
+
+# -------------------------------------------------
+# Metrik gaya Prometheus. Semua pencatatan terjadi di event loop (single thread),
+# jadi counter & histogram cukup berupa list biasa tanpa lock.
+# -------------------------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SKEW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class MetricCounter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class MetricHistogram:
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [hitungan per bucket (non-kumulatif) ..., +Inf, sum]
+        self._series = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series):
+                cumulative += hits
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+HANDLER_LATENCY = MetricHistogram(
+    "bot_handler_latency_seconds", "Durasi eksekusi handler Telegram", labelnames=("handler",))
+HANDLER_ERRORS = MetricCounter(
+    "bot_handler_errors_total", "Exception yang keluar dari handler", labelnames=("handler",))
+REMINDER_SKEW = MetricHistogram(
+    "bot_reminder_skew_seconds", "Selisih waktu reminder dijalankan/terkirim dari jadwalnya",
+    buckets=SKEW_BUCKETS, labelnames=("stage",))
+SEND_LATENCY = MetricHistogram(
+    "bot_send_message_latency_seconds", "Latensi panggilan send_message ke Bot API")
+SEND_ERRORS = MetricCounter(
+    "bot_send_message_errors_total", "Kegagalan send_message per jenis error", labelnames=("error",))
+EDIT_EVENTS = MetricCounter(
+    "bot_message_edits_total", "Edit pesan: terkirim, dilewati (isi sama), atau digabung", labelnames=("result",))
+EDIT_BYTES = MetricHistogram(
+    "bot_edit_message_bytes", "Ukuran payload editMessageText (teks + reply_markup JSON)",
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384))
+MISSED_REMINDERS = MetricCounter(
+    "bot_missed_reminders_total", "Reminder terlewat yang dikirim lewat ringkasan catch-up", labelnames=("trigger",))
+LOOP_LAG = MetricHistogram(
+    "bot_event_loop_lag_seconds", "Keterlambatan bangun task watchdog event loop", buckets=SKEW_BUCKETS)
+
+
+# Panggilan handler/job terakhir: (durasi detik, nama, jenis update, epoch selesai)
+recent_calls = collections.deque(maxlen=SLOW_CALL_HISTORY)
+
+
+def update_kind(update) -> str:
+    """Jenis update singkat untuk /admin/slow, mis. "command:/start" atau "callback:done"."""
+    query = getattr(update, "callback_query", None)
+    if query is not None:
+        return f"callback:{(query.data or '').split('_', 1)[0]}"
+    message = getattr(update, "message", None)
+    if message is not None and message.text and message.text.startswith("/"):
+        return f"command:{message.text.split(maxsplit=1)[0]}"
+    return "message" if message is not None else "other"
+
+
+def instrument(name: str, handler):
+    """Bungkus handler agar durasi dan error-nya tercatat di HANDLER_LATENCY/HANDLER_ERRORS."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await handler(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HANDLER_LATENCY.observe(elapsed, name)
+            recent_calls.append((elapsed, name, update_kind(update), time.time()))
+    return wrapper
+
+# -------------------------------------------------
+# Antrian kirim keluar: token bucket global + per chat, retry RetryAfter,
+# dan penggabungan (coalescing) pesan untuk chat/thread/menit yang sama
+# -------------------------------------------------
+class TokenBucket:
+    """Token bucket sederhana; token boleh negatif sebagai reservasi slot berikutnya."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Berapa detik lagi sampai satu token tersedia (tanpa mengambilnya)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        """Ambil satu token; kembalikan jeda yang harus ditunggu sebelum mengirim."""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Kosongkan bucket sehingga token berikutnya baru tersedia setelah `seconds`."""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+@dataclasses.dataclass
+class OutgoingMessage:
+    chat_id: int
+    thread_id: int | None
+    texts: list
+    coalesce_key: object = None
+    attempts: int = 0
+    scheduled_at: float = None  # epoch detik jadwal reminder, untuk metrik skew
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+
+class SendQueue:
+    """
+    Pipeline kirim asinkron. Pesan yang masih mengantri dengan coalesce_key,
+    chat_id dan thread_id yang sama digabung menjadi satu pesan.
+    """
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE, chat_per_minute=SEND_CHAT_PER_MINUTE, workers=SEND_WORKERS):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_per_minute / 60.0
+        self.chat_capacity = chat_per_minute
+        self.chat_buckets = {}
+        self.workers = workers
+        self.bot = None
+        self._queue = None
+        self._pending = {}
+        self._tasks = []
+
+    def start(self, bot):
+        self.bot = bot
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_capacity)
+        return bucket
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def enqueue(self, chat_id: int, text: str, thread_id=None, coalesce_key=None, scheduled_at=None):
+        if coalesce_key is not None:
+            key = (chat_id, thread_id, coalesce_key)
+            item = self._pending.get(key)
+            if item is not None and len(item.text) + len(text) + 1 <= MESSAGE_MAX_LENGTH:
+                item.texts.append(text)
+                return
+            item = self._pending[key] = OutgoingMessage(chat_id, thread_id, [text], coalesce_key, scheduled_at=scheduled_at)
+        else:
+            item = OutgoingMessage(chat_id, thread_id, [text], scheduled_at=scheduled_at)
+        self._queue.put_nowait(item)
+
+    def _requeue_later(self, item: OutgoingMessage, delay: float):
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, item)
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._process(item)
+            except Exception:
+                logger.exception("Gagal memproses antrian kirim untuk chat %s", item.chat_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, item: OutgoingMessage):
+        chat_bucket = self._chat_bucket(item.chat_id)
+        wait = chat_bucket.delay()
+        if wait > 0:
+            # Jangan blok worker; antrikan kembali saat kuota chat tersedia
+            self._requeue_later(item, wait)
+            return
+
+        # Mulai dari sini pesan tidak bisa digabung lagi
+        if item.coalesce_key is not None:
+            self._pending.pop((item.chat_id, item.thread_id, item.coalesce_key), None)
+
+        chat_bucket.reserve()
+        wait = self.global_bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        started = time.perf_counter()
+        try:
+            await self.bot.send_message(
+                chat_id=item.chat_id,
+                message_thread_id=item.thread_id,
+                text=item.text,
+            )
+            SEND_LATENCY.observe(time.perf_counter() - started)
+            if item.scheduled_at is not None:
+                REMINDER_SKEW.observe(time.time() - item.scheduled_at, "send")
+        except RetryAfter as exc:
+            SEND_ERRORS.inc("RetryAfter")
+            retry_after = exc.retry_after
+            if isinstance(retry_after, datetime.timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning("Flood control untuk chat %s, coba lagi dalam %ss", item.chat_id, retry_after)
+            chat_bucket.pause(retry_after)
+            self._retry(item, retry_after)
+        except (Forbidden, BadRequest) as exc:
+            # Bot dikeluarkan / chat tidak valid: tidak ada gunanya diulang
+            SEND_ERRORS.inc(type(exc).__name__)
+            logger.warning("Pesan ke chat %s dibuang: %s", item.chat_id, exc)
+        except TelegramError as exc:
+            SEND_ERRORS.inc(type(exc).__name__)
+            logger.warning("Gagal kirim ke chat %s (percobaan %d): %s", item.chat_id, item.attempts + 1, exc)
+            self._retry(item, 2 ** item.attempts)
+
+    def _retry(self, item: OutgoingMessage, delay: float):
+        item.attempts += 1
+        if item.attempts >= SEND_MAX_ATTEMPTS:
+            logger.error("Pesan ke chat %s dibuang setelah %d percobaan", item.chat_id, item.attempts)
+            return
+        self._requeue_later(item, delay)
+
+
+# Batas global Telegram berlaku per token bot, jadi dibagi rata ke semua worker
+send_queue = SendQueue(global_rate=SEND_GLOBAL_RATE / max(WORKERS, 1))
+
+# -------------------------------------------------
+# Penggabung edit pesan: tap beruntun pada satu pesan hanya menghasilkan satu
+# edit_message_text berisi versi terakhir, dan edit dilewati bila isinya sama
+# -------------------------------------------------
+class EditCoalescer:
+    def __init__(self, window: float, max_tracked: int = 4096):
+        self.window = window
+        self.max_tracked = max_tracked
+        self._pending = {}  # (chat_id, message_id) -> [task, render]
+        self._digests = collections.OrderedDict()  # (chat_id, message_id) -> digest isi terakhir
+
+    @staticmethod
+    def digest(text: str, reply_markup=None) -> bytes:
+        payload = text if reply_markup is None else text + reply_markup.to_json()
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+    def _remember(self, key, digest: bytes):
+        self._digests[key] = digest
+        self._digests.move_to_end(key)
+        while len(self._digests) > self.max_tracked:
+            self._digests.popitem(last=False)
+
+    def request(self, bot, chat_id: int, message_id: int, render, parse_mode=None):
+        """
+        Jadwalkan edit tertunda. `render` dipanggil saat jendela berakhir dan
+        mengembalikan (teks, reply_markup) dari state terbaru.
+        """
+        key = (chat_id, message_id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending[1] = render
+            EDIT_EVENTS.inc("coalesced")
+            return
+        task = asyncio.create_task(self._flush_later(bot, key, parse_mode))
+        self._pending[key] = [task, render]
+
+    async def edit_now(self, bot, chat_id: int, message_id: int, text: str, reply_markup=None, parse_mode=None):
+        """Edit langsung (mis. navigasi/aktivasi); edit tertunda untuk pesan ini dibatalkan."""
+        key = (chat_id, message_id)
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending[0].cancel()
+        await self._edit(bot, key, text, reply_markup, parse_mode)
+
+    async def _flush_later(self, bot, key, parse_mode):
+        await asyncio.sleep(self.window)
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        try:
+            # Render ikut di dalam try: section bisa hilang karena reload selama jendela debounce
+            text, reply_markup = pending[1]()
+            await self._edit(bot, key, text, reply_markup, parse_mode)
+        except Exception:
+            logger.exception("Edit tertunda untuk pesan %s gagal", key)
+
+    async def _edit(self, bot, key, text, reply_markup, parse_mode):
+        digest = self.digest(text, reply_markup)
+        if self._digests.get(key) == digest:
+            EDIT_EVENTS.inc("skipped")
+            return
+        chat_id, message_id = key
+        try:
+            await bot.edit_message_text(
+                text, chat_id=chat_id, message_id=message_id, parse_mode=parse_mode, reply_markup=reply_markup,
+            )
+        except BadRequest as exc:
+            if "not modified" not in str(exc).lower():
+                raise
+        self._remember(key, digest)
+        EDIT_EVENTS.inc("sent")
+        EDIT_BYTES.observe(len(text.encode()) + (len(reply_markup.to_json().encode()) if reply_markup else 0))
+
+
+edit_coalescer = EditCoalescer(EDIT_DEBOUNCE)
+
+# -------------------------------------------------
+# Persistence berbasis SQLite (WAL): hanya baris (chat_id, section) yang
+# berubah yang ditulis, dikumpulkan dan di-flush secara write-behind
+# -------------------------------------------------
+class SqlitePersistence(BasePersistence):
+    """
+    Pengganti PicklePersistence. bot_data["active_sections"] dan
+    bot_data["completed_tasks"] disimpan per baris (chat_id, section);
+    handler memanggil mark_dirty() agar flush berikutnya hanya menulis
+    baris yang berubah. Data lain disimpan sebagai blob pickle per kunci.
+    bot_data tidak diserahkan ke PTB karena PTB men-deepcopy seluruhnya pada
+    setiap flush; start_bot memuatnya lewat attach_bot_data() dan job
+    persist_bot_data menulis baris kotor langsung dari dict aplikasi.
+    """
+
+    STATE_KEYS = ("active_sections", "completed_tasks", "completion_history")
+    # Kunci bot_kv yang sama untuk semua worker; kunci lain disimpan per shard (akhiran @index)
+    SHARED_KV_KEYS = ("entry_ids", "polling_offset", "__callback_data__")
+
+    def __init__(self, filepath: str, legacy_pickle: str = None, update_interval: float = 60, shard=(0, 1)):
+        super().__init__(store_data=PersistenceInput(bot_data=False), update_interval=update_interval)
+        self.filepath = filepath
+        self.legacy_pickle = legacy_pickle
+        # (index, jumlah): worker hanya memuat chat miliknya, file SQLite dipakai bersama
+        self.shard_index, self.shard_count = shard
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._bot_data = None
+        self._dirty = set()  # {(chat_id, section)}; section None = seluruh chat
+        self._blob_cache = {}  # (tabel, kunci) -> bytes terakhir yang ditulis
+        self._history_written = {}  # (chat_id, section) -> generasi riwayat terbaru yang sudah ditulis
+        self.rows_written = 0
+        self.bytes_written = 0
+
+    # -- koneksi & skema ---------------------------------------------------
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.filepath, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")  # worker lain bisa sedang menulis
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chat_sections (
+                    chat_id INTEGER NOT NULL,
+                    section TEXT NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 0,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (chat_id, section)
+                );
+                CREATE TABLE IF NOT EXISTS completion_history (
+                    chat_id INTEGER NOT NULL,
+                    section TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    completed INTEGER NOT NULL,
+                    PRIMARY KEY (chat_id, section, generation)
+                );
+                CREATE TABLE IF NOT EXISTS bot_kv (key TEXT PRIMARY KEY, value BLOB NOT NULL);
+                CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, value BLOB NOT NULL);
+                CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, value BLOB NOT NULL);
+                CREATE TABLE IF NOT EXISTS conversations (
+                    name TEXT NOT NULL, key TEXT NOT NULL, state BLOB NOT NULL,
+                    PRIMARY KEY (name, key)
+                );
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_sections)")}
+            if "generation" not in columns:
+                conn.execute("ALTER TABLE chat_sections ADD COLUMN generation INTEGER")
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        # Semua akses SQLite lewat satu thread pada satu waktu agar event loop tidak terblokir
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _execute_batch(self, statements):
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+                self.rows_written += 1
+                self.bytes_written += sum(len(p) for p in params if isinstance(p, (bytes, str)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # -- migrasi satu kali dari reminder_data.pkl -----------------------------
+    def _migrate_legacy_pickle(self):
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_pickle_migrated'").fetchone():
+            return
+        if self.legacy_pickle and os.path.exists(self.legacy_pickle):
+            with open(self.legacy_pickle, "rb") as f:
+                legacy = pickle.load(f)
+            normalize_completed_tasks(legacy.get("bot_data", {}))
+            statements = self._state_statements(legacy.get("bot_data", {}), None)
+            for key, value in legacy.get("bot_data", {}).items():
+                if key not in self.STATE_KEYS:
+                    statements.append(("INSERT OR REPLACE INTO bot_kv VALUES (?, ?)", (key, pickle.dumps(value))))
+            for chat_id, data in (legacy.get("chat_data") or {}).items():
+                statements.append(("INSERT OR REPLACE INTO chat_data VALUES (?, ?)", (chat_id, pickle.dumps(data))))
+            for user_id, data in (legacy.get("user_data") or {}).items():
+                statements.append(("INSERT OR REPLACE INTO user_data VALUES (?, ?)", (user_id, pickle.dumps(data))))
+            if legacy.get("callback_data") is not None:
+                statements.append(("INSERT OR REPLACE INTO bot_kv VALUES (?, ?)",
+                                   ("__callback_data__", pickle.dumps(legacy["callback_data"]))))
+            for name, conversation in (legacy.get("conversations") or {}).items():
+                for key, state in conversation.items():
+                    statements.append(("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)",
+                                       (name, json.dumps(list(key)), pickle.dumps(state))))
+            self._execute_batch(statements)
+            os.replace(self.legacy_pickle, f"{self.legacy_pickle}.migrated")
+            logger.info("Migrasi %s ke %s selesai (%d baris)", self.legacy_pickle, self.filepath, len(statements))
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_pickle_migrated', '1')")
+
+    # -- pembagian shard ------------------------------------------------------
+    def owns_chat(self, chat_id: int) -> bool:
+        return self.shard_count == 1 or chat_id % self.shard_count == self.shard_index
+
+    def _kv_name(self, key: str) -> str:
+        """Nama baris bot_kv untuk kunci bot_data."""
+        if self.shard_count == 1 or key in self.SHARED_KV_KEYS:
+            return key
+        return f"{key}@{self.shard_index}"
+
+    def _kv_key(self, name: str):
+        """Kebalikan _kv_name; None jika baris milik shard lain."""
+        if self.shard_count == 1 or name in self.SHARED_KV_KEYS:
+            return name
+        key, sep, index = name.rpartition("@")
+        return key if sep and index == str(self.shard_index) else None
+
+    # -- konversi state <-> baris ---------------------------------------------
+    def _state_statements(self, bot_data: dict, dirty):
+        """Buat statement INSERT/DELETE untuk baris (chat_id, section) yang kotor (None = semua)."""
+        active_sections = bot_data.get("active_sections", {})
+        completed_tasks = bot_data.get("completed_tasks", {})
+        histories = bot_data.get("completion_history", {})
+        if dirty is None:
+            dirty = {(chat_id, None) for chat_id in set(active_sections) | set(completed_tasks)}
+
+        statements = []
+        for chat_id, section in dirty:
+            if section is None:
+                statements.append(("DELETE FROM chat_sections WHERE chat_id = ?", (chat_id,)))
+                sections = SECTION_ENTRIES
+            else:
+                sections = (section,)
+            active = active_sections.get(chat_id, {})
+            completed = completed_tasks.get(chat_id, {})
+            history = histories.get(chat_id, {})
+            for sec in sections:
+                generation, mask = completed.get(sec, (None, 0))
+                if active.get(sec) or mask:
+                    statements.append((
+                        "INSERT OR REPLACE INTO chat_sections (chat_id, section, active, completed, generation)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (chat_id, sec, int(bool(active.get(sec))), mask, generation),
+                    ))
+                elif section is not None:
+                    statements.append(("DELETE FROM chat_sections WHERE chat_id = ? AND section = ?", (chat_id, sec)))
+                statements.extend(self._history_statements(chat_id, sec, history.get(sec, ())))
+        return statements
+
+    def _history_statements(self, chat_id: int, section: str, history):
+        """Tulis hanya entri riwayat yang lebih baru dari yang sudah tersimpan."""
+        if not history:
+            return []
+        written = self._history_written.get((chat_id, section), -1)
+        statements = [
+            ("INSERT OR REPLACE INTO completion_history VALUES (?, ?, ?, ?)", (chat_id, section, generation, mask))
+            for generation, mask in history if generation > written
+        ]
+        if statements:
+            statements.append((
+                "DELETE FROM completion_history WHERE chat_id = ? AND section = ? AND generation < ?",
+                (chat_id, section, history[0][0]),
+            ))
+            self._history_written[(chat_id, section)] = history[-1][0]
+        return statements
+
+    def _load_bot_data(self):
+        self._migrate_legacy_pickle()
+        conn = self._connect()
+        bot_data = {}
+        for name, value in conn.execute("SELECT key, value FROM bot_kv WHERE key != '__callback_data__'"):
+            key = self._kv_key(name)
+            if key is None:
+                continue
+            bot_data[key] = pickle.loads(value)
+            self._blob_cache[("bot_kv", name)] = value
+        active_sections = bot_data.setdefault("active_sections", {})
+        completed_tasks = bot_data.setdefault("completed_tasks", {})
+        rows = conn.execute("SELECT chat_id, section, active, completed, generation FROM chat_sections")
+        for chat_id, section, active, completed, generation in rows:
+            if not self.owns_chat(chat_id):
+                continue
+            if active:
+                active_sections.setdefault(chat_id, {})[section] = True
+            if isinstance(completed, str):
+                # Baris lama menyimpan daftar teks pesan dalam JSON
+                if completed.startswith("["):
+                    completed = messages_to_masks(json.loads(completed)).get(section, 0)
+                else:
+                    completed = int(completed)
+            if completed:
+                completed_tasks.setdefault(chat_id, {})[section] = (
+                    completed if generation is None else (generation, completed)
+                )
+        normalize_completed_tasks(bot_data)
+
+        histories = bot_data.setdefault("completion_history", {})
+        rows = conn.execute(
+            "SELECT chat_id, section, generation, completed FROM completion_history ORDER BY generation"
+        )
+        for chat_id, section, generation, completed in rows:
+            if not self.owns_chat(chat_id):
+                continue
+            histories.setdefault(chat_id, {}).setdefault(section, []).append((generation, completed))
+            self._history_written[(chat_id, section)] = generation
+        return bot_data
+
+    def _load_blobs(self, table: str, id_column: str):
+        conn = self._connect()
+        self._migrate_legacy_pickle()
+        result = {}
+        for key, value in conn.execute(f"SELECT {id_column}, value FROM {table}"):
+            if table == "chat_data" and not self.owns_chat(key):
+                continue
+            result[key] = pickle.loads(value)
+            self._blob_cache[(table, key)] = value
+        return result
+
+    def _blob_statement(self, table: str, key, value):
+        blob = pickle.dumps(value)
+        if self._blob_cache.get((table, key)) == blob:
+            return None
+        self._blob_cache[(table, key)] = blob
+        return (f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", (key, blob))
+
+    # -- API untuk handler --------------------------------------------------
+    def mark_dirty(self, chat_id: int, section: str = None):
+        """Tandai state chat (atau satu section-nya) untuk ditulis pada flush berikutnya."""
+        self._dirty.add((chat_id, section))
+
+    async def attach_bot_data(self, bot_data: dict):
+        """Isi bot_data aplikasi di tempat; flush berikutnya membaca dict yang sama tanpa salinan."""
+        bot_data.update(await self.get_bot_data())
+        self._bot_data = bot_data
+
+    async def save_bot_data(self):
+        if self._bot_data is not None:
+            await self.update_bot_data(self._bot_data)
+
+    # -- implementasi BasePersistence -----------------------------------------
+    async def get_bot_data(self) -> dict:
+        if self._bot_data is None:
+            self._bot_data = await self._run(self._load_bot_data)
+        return self._bot_data
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._bot_data = data
+        dirty, self._dirty = self._dirty, set()
+        statements = self._state_statements(data, dirty) if dirty else []
+        for key, value in data.items():
+            if key not in self.STATE_KEYS:
+                statement = self._blob_statement("bot_kv", self._kv_name(key), value)
+                if statement:
+                    statements.append(statement)
+        for table, name in list(self._blob_cache):
+            if table == "bot_kv" and name != "__callback_data__" and self._kv_key(name) not in data:
+                del self._blob_cache[(table, name)]
+                statements.append(("DELETE FROM bot_kv WHERE key = ?", (name,)))
+        if statements:
+            try:
+                await self._run(self._execute_batch, statements)
+            except Exception:
+                # Tulis ulang pada flush berikutnya
+                self._dirty |= dirty
+                raise
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def get_chat_data(self) -> dict:
+        return await self._run(self._load_blobs, "chat_data", "chat_id")
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        statement = self._blob_statement("chat_data", chat_id, data)
+        if statement:
+            await self._run(self._execute_batch, [statement])
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._blob_cache.pop(("chat_data", chat_id), None)
+        await self._run(self._execute_batch, [("DELETE FROM chat_data WHERE chat_id = ?", (chat_id,))])
+
+    async def get_user_data(self) -> dict:
+        return await self._run(self._load_blobs, "user_data", "user_id")
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        statement = self._blob_statement("user_data", user_id, data)
+        if statement:
+            await self._run(self._execute_batch, [statement])
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._blob_cache.pop(("user_data", user_id), None)
+        await self._run(self._execute_batch, [("DELETE FROM user_data WHERE user_id = ?", (user_id,))])
+
+    async def get_callback_data(self):
+        def load():
+            self._migrate_legacy_pickle()
+            row = self._connect().execute("SELECT value FROM bot_kv WHERE key = '__callback_data__'").fetchone()
+            return pickle.loads(row[0]) if row else None
+        return await self._run(load)
+
+    async def update_callback_data(self, data) -> None:
+        statement = self._blob_statement("bot_kv", "__callback_data__", data)
+        if statement:
+            await self._run(self._execute_batch, [statement])
+
+    async def get_conversations(self, name: str) -> dict:
+        def load():
+            self._migrate_legacy_pickle()
+            rows = self._connect().execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+            return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+        return await self._run(load)
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        if new_state is None:
+            statement = ("DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(list(key))))
+        else:
+            statement = ("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)",
+                         (name, json.dumps(list(key)), pickle.dumps(new_state)))
+        await self._run(self._execute_batch, [statement])
+
+    async def flush(self) -> None:
+        await self.save_bot_data()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+
+persistence = SqlitePersistence(
+    filepath=PERSISTENCE_FILE,
+    legacy_pickle=LEGACY_PICKLE_FILE,
+    update_interval=PERSISTENCE_INTERVAL,
+    shard=(int(WORKER_INDEX or 0), WORKERS),
+)
+
+async def persist_bot_data(context: ContextTypes.DEFAULT_TYPE):
+    """Job berkala: biaya sebanding jumlah baris yang ditandai mark_dirty(), bukan jumlah chat."""
+    await persistence.save_bot_data()
 
+# -------------------------------------------------
+# Fungsi untuk memilih pesan reminder yang masih perlu dikirim
+# -------------------------------------------------
+def due_reminders(bot_data: dict, chat_id: int, section: str, entries: list) -> list:
     # Cek apakah section masih aktif
-    active_sections = context.bot_data.get("active_sections", {}).get(chat_id, {})
+    active_sections = bot_data.get("active_sections", {}).get(chat_id, {})
     if not active_sections.get(section):
-        return
+        return []
 
-    # Kirim reminder
-    await context.bot.send_message(
-        chat_id=chat_id,
-        message_thread_id=thread_id,
-        text=f"🔔 {message}"
-    )
+    # Lewati pesan yang sudah ditandai selesai
+    mask = get_completed_mask(bot_data, chat_id, section)
+    return [entry.message for entry in entries if not is_done(mask, entry)]
+
+# -------------------------------------------------
+# Dispatcher: dipanggil sekali per menit UTC yang punya jadwal, lalu fan-out
+# ke semua chat yang berlangganan section terkait. Semua reminder untuk
+# chat/thread yang sama di menit ini digabung menjadi satu pesan.
+# -------------------------------------------------
+def scheduled_utc(key, now: datetime.datetime) -> datetime.datetime:
+    """Waktu jadwal terakhir (<= now) untuk kunci menit UTC (jam, menit)."""
+    hour, minute = key
+    scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if scheduled > now:
+        scheduled -= datetime.timedelta(days=1)
+    return scheduled
+
+def dispatch_key(bot_data: dict, key, scheduled_at: float) -> bool:
+    """Fan-out satu menit jadwal ke chat lokal; False jika menit ini sudah pernah dikirim."""
+    if scheduled_at <= bot_data.get("last_dispatch", 0):
+        return False  # menit ini sudah terkirim lewat catch-up
+    bot_data["last_dispatch"] = scheduled_at
+    REMINDER_SKEW.observe(time.time() - scheduled_at, "dispatch")
+    batches = {}
+    for section, entries in minute_index.get(key, {}).items():
+        for chat_id, thread_id in reminder_registry.subscribers(section).items():
+            due = due_reminders(bot_data, chat_id, section, entries)
+            if due:
+                batches.setdefault((chat_id, thread_id), []).extend(due)
+
+    for (chat_id, thread_id), messages in batches.items():
+        text = "\n".join(f"🔔 {message}" for message in messages)
+        send_queue.enqueue(chat_id, text, thread_id=thread_id, coalesce_key=("reminder", key), scheduled_at=scheduled_at)
+    return True
+
+async def dispatch_minute(context: ContextTypes.DEFAULT_TYPE):
+    key = context.job.data
+    scheduled_at = scheduled_utc(key, datetime.datetime.now(pytz.utc)).timestamp()
+    started = time.perf_counter()
+    dispatch_key(context.bot_data, key, scheduled_at)
+    recent_calls.append((time.perf_counter() - started, "dispatch_minute", f"job:{_dispatch_job_name(key)}", time.time()))
+    if cluster.enabled:
+        # Hanya leader yang punya timer; worker lain menerima detaknya lewat Unix socket
+        await cluster.broadcast("dispatch", {"key": list(key), "scheduled_at": scheduled_at})
 
 # -------------------------------------------------
 # Handler /start, membuat tombol untuk pilih section
 # -------------------------------------------------
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+MENU_TEXT = "🕒 Pilih bagian jadwal untuk dikendalikan:"
+
+
+def section_menu_markup():
     keyboard = [
-        [InlineKeyboardButton("Pagi", callback_data="section_Pagi")],
-        [InlineKeyboardButton("Siang", callback_data="section_Siang")],
-        [InlineKeyboardButton("Malam", callback_data="section_Malam")],
+        [InlineKeyboardButton(section, callback_data=f"section_{section}")]
+        for section in SECTION_ENTRIES
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("🕒 Pilih bagian jadwal untuk dikendalikan:", reply_markup=reply_markup)
+    return InlineKeyboardMarkup(keyboard)
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(MENU_TEXT, reply_markup=section_menu_markup())
+
+async def answer_unknown_section(context: ContextTypes.DEFAULT_TYPE, query, section: str):
+    """Tombol lama untuk section yang sudah dihapus/diganti nama lewat SCHEDULE_FILE: kembali ke menu."""
+    await query.answer(f"⚠️ Bagian {section} sudah tidak ada di jadwal.", show_alert=True)
+    await edit_coalescer.edit_now(
+        context.bot, query.message.chat.id, query.message.message_id, MENU_TEXT, reply_markup=section_menu_markup(),
+    )
 
 # -------------------------------------------------
 # Handler ketika user memilih salah satu section
 # -------------------------------------------------
 async def section_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     section = query.data.split("_")[1]
-    chat_id = query.message.chat.id
+    if section not in SECTION_ENTRIES:
+        await answer_unknown_section(context, query, section)
+        return
+    await query.answer()
+    await show_section(context, query, section)
 
-    completed = context.bot_data.get("completed_tasks", {}).get(chat_id, set())
+async def show_section(context: ContextTypes.DEFAULT_TYPE, query, section: str):
+    chat_id = query.message.chat.id
+    mask = get_completed_mask(context.bot_data, chat_id, section)
 
-    # Membangun teks beserta inline keyboard untuk satu section
-    lines = [f"📋 Jadwal *{section}*:"]
-    keyboard = [
-        [InlineKeyboardButton("✅ Aktifkan", callback_data=f"activate_{section}")]
-    ]
-    for h, m, msg in REMINDER_SECTIONS[section]:
-        status = "✅" if msg in completed else "❌"
-        lines.append(f"{status} {h:02d}:{m:02d} - {msg}")
-        keyboard.append([InlineKeyboardButton(f"{status} {h:02d}:{m:02d} - {msg}", callback_data=f"done_{section}_{msg}")])
-    keyboard.append([InlineKeyboardButton("❌ Reset", callback_data=f"reset_{section}")])
-    keyboard.append([InlineKeyboardButton("🔙 Kembali", callback_data="go_back")])
+    # Teks beserta inline keyboard untuk satu section (diambil dari cache render)
+    text, reply_markup = render_section(section, mask, VIEW_SECTION)
+    await edit_coalescer.edit_now(
+        context.bot, chat_id, query.message.message_id, text, reply_markup=reply_markup, parse_mode="Markdown",
+    )
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text("\n".join(lines), parse_mode="Markdown", reply_markup=reply_markup)
+# -------------------------------------------------
+# Handler navigasi halaman & filter "belum selesai" pada keyboard section
+# -------------------------------------------------
+async def change_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    _, section, code, page, pending_only = query.data.split("_")
+    if section not in SECTION_ENTRIES:
+        await answer_unknown_section(context, query, section)
+        return
+    await query.answer()
+    chat_id = query.message.chat.id
+    mask = get_completed_mask(context.bot_data, chat_id, section)
+    text, reply_markup = render_section(section, mask, VIEW_BY_CODE[code], int(page), pending_only == "1")
+    await edit_coalescer.edit_now(
+        context.bot, chat_id, query.message.message_id, text, reply_markup=reply_markup, parse_mode="Markdown",
+    )
 
 # -------------------------------------------------
 # Handler untuk mengaktifkan section (menjadwalkan reminder)
 # -------------------------------------------------
 async def activate_section(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     section = query.data.split("_")[1]
+    if section not in SECTION_ENTRIES:
+        await answer_unknown_section(context, query, section)
+        return
+    await query.answer()
     chat_id = query.message.chat.id
 
     # Tandai section sebagai aktif
     context.bot_data.setdefault("active_sections", {}).setdefault(chat_id, {})[section] = True
+    persistence.mark_dirty(chat_id, section)
 
     # Jadwalkan reminder untuk seluruh entry di section tersebut
     await schedule_section_reminders(context.application, chat_id, section)
 
-    await query.edit_message_text(
+    await edit_coalescer.edit_now(
+        context.bot, chat_id, query.message.message_id,
         f"✅ Pengingat untuk bagian *{section}* telah diaktifkan.",
         parse_mode='Markdown'
     )
@@ -205,51 +1394,74 @@ async def activate_section(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # -------------------------------------------------
 async def reset_section(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     section = query.data.split("_")[1]
     chat_id = query.message.chat.id
 
-    # Hentikan semua job yang berhubungan dengan section ini
-    if chat_id in user_jobs:
-        for job in user_jobs[chat_id][:]:
-            job_data = job.data or {}
-            if job_data.get("section") == section:
-                try:
-                    job.schedule_removal()
-                except JobLookupError:
-                    # Job sudah terhapus dari scheduler, abaikan
-                    pass
-                user_jobs[chat_id].remove(job)
+    # Hentikan semua reminder yang berhubungan dengan section ini
+    unschedule_section_reminders(chat_id, section)
 
     # Nonaktifkan section
     if "active_sections" in context.bot_data and chat_id in context.bot_data["active_sections"]:
         context.bot_data["active_sections"][chat_id].pop(section, None)
 
     # Hapus semua tanda ✅ untuk pesan di section ini
-    completed = context.bot_data.setdefault("completed_tasks", {}).setdefault(chat_id, set())
-    for _, _, msg in REMINDER_SECTIONS[section]:
-        completed.discard(msg)
+    set_completed_mask(context.bot_data, chat_id, section, 0)
+    persistence.mark_dirty(chat_id, section)
 
     # Tampilkan ulang daftar jadwal; semua status kembali ke ❌
-    await section_handler(update, context)
+    if section not in SECTION_ENTRIES:
+        await answer_unknown_section(context, query, section)
+        return
+    await query.answer()
+    await show_section(context, query, section)
 
 # -------------------------------------------------
 # Handler untuk menandai sebuah pesan sudah selesai (done/tidak done)
 # -------------------------------------------------
+_DONE_STATE = re.compile(r"^(\d+)(?:_([sa])_(\d+)_([01]))?$")
+
+
 async def mark_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    _, section, msg = query.data.split("_", 2)
+    _, section, payload = query.data.split("_", 2)
     chat_id = query.message.chat.id
+    if section not in SECTION_ENTRIES:
+        await answer_unknown_section(context, query, section)
+        return
 
-    context.bot_data.setdefault("completed_tasks", {}).setdefault(chat_id, set())
-
-    if msg in context.bot_data["completed_tasks"][chat_id]:
-        context.bot_data["completed_tasks"][chat_id].remove(msg)
+    # done_<section>_<id>[_<kode tampilan>_<halaman>_<filter>]
+    view, page, pending_only = VIEW_SECTION, 0, KEYBOARD_PENDING_ONLY
+    state = _DONE_STATE.match(payload)
+    if state:
+        entry = ENTRY_BY_ID.get((section, int(state.group(1))))
+        if state.group(2):
+            view, page, pending_only = VIEW_BY_CODE[state.group(2)], int(state.group(3)), state.group(4) == "1"
     else:
-        context.bot_data["completed_tasks"][chat_id].add(msg)
+        # Tombol lama masih membawa teks pesan di callback_data
+        entry = ENTRY_BY_MESSAGE.get((section, payload))
+
+    if entry is None:
+        # Entry sudah dihapus dari jadwal setelah keyboard ini dikirim: tampilkan versi terbaru
+        await query.answer("⚠️ Jadwal ini sudah berubah, daftar diperbarui.")
+        text, reply_markup = render_section(
+            section, get_completed_mask(context.bot_data, chat_id, section), view, page, pending_only,
+        )
+        await edit_coalescer.edit_now(
+            context.bot, chat_id, query.message.message_id, text, reply_markup=reply_markup, parse_mode="Markdown",
+        )
+        return
 
-    # Tampilkan ulang daftar jadwal untuk section itu dengan status terbaru
-    await section_handler(update, context)
+    mask = get_completed_mask(context.bot_data, chat_id, section)
+    set_completed_mask(context.bot_data, chat_id, section, mask ^ (1 << entry.id))
+    persistence.mark_dirty(chat_id, section)
+    await query.answer()
+
+    # Tampilkan ulang daftar jadwal dengan status terbaru; tap beruntun digabung jadi satu edit
+    edit_coalescer.request(
+        context.bot, chat_id, query.message.message_id,
+        lambda: render_section(section, get_completed_mask(context.bot_data, chat_id, section), view, page, pending_only),
+        parse_mode="Markdown",
+    )
 
 # -------------------------------------------------
 # Handler “Kembali” (untuk kembali ke menu utama /start)
@@ -260,61 +1472,462 @@ async def go_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await start(query, context)
 
 # -------------------------------------------------
-# Fungsi utama untuk menjadwalkan semua reminder di satu section
+# Registry langganan reminder, diindeks per (chat_id, section)
 # -------------------------------------------------
-async def schedule_section_reminders(application: ApplicationBuilder, chat_id: int, section: str, thread_id=None):
+class ReminderRegistry:
+    """
+    Index langganan reminder. Menyimpan (chat_id, section) -> thread_id, plus
+    index turunan section -> {chat_id: thread_id} (untuk fan-out dispatcher)
+    dan chat_id -> {section} (untuk reset satu chat), sehingga tambah/hapus O(1).
+    """
+
+    def __init__(self):
+        self._by_key = {}
+        self._by_section = {}
+        self._by_chat = {}
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def add(self, chat_id: int, section: str, thread_id=None):
+        self._by_key[(chat_id, section)] = thread_id
+        self._by_section.setdefault(section, {})[chat_id] = thread_id
+        self._by_chat.setdefault(chat_id, set()).add(section)
+
+    def remove(self, chat_id: int, section: str) -> bool:
+        if self._by_key.pop((chat_id, section), _MISSING) is _MISSING:
+            return False
+        subscribers = self._by_section[section]
+        del subscribers[chat_id]
+        if not subscribers:
+            del self._by_section[section]
+        sections = self._by_chat[chat_id]
+        sections.discard(section)
+        if not sections:
+            del self._by_chat[chat_id]
+        return True
+
+    def remove_chat(self, chat_id: int) -> int:
+        sections = list(self._by_chat.get(chat_id, ()))
+        for section in sections:
+            self.remove(chat_id, section)
+        return len(sections)
+
+    def subscribers(self, section: str) -> dict:
+        return self._by_section.get(section, {})
+
+    def sections_for(self, chat_id: int) -> set:
+        return self._by_chat.get(chat_id, set())
+
+    def chat_count(self) -> int:
+        return len(self._by_chat)
+
+    def rehydrate(self, active_sections: dict) -> int:
+        """Bangun ulang seluruh index dalam satu lintasan dari bot_data["active_sections"]."""
+        self._by_key.clear()
+        self._by_section.clear()
+        self._by_chat.clear()
+        for chat_id, sections in active_sections.items():
+            for section, active in sections.items():
+                if active and section in SECTION_ENTRIES:
+                    self.add(chat_id, section)
+        return len(self._by_key)
+
+
+_MISSING = object()
+reminder_registry = ReminderRegistry()
+
+# -------------------------------------------------
+# Fungsi pembantu untuk index menit & timer dispatcher
+# -------------------------------------------------
+def reminder_utc_minute(hour: int, minute: int):
+    """
+    Hitung waktu pengingat 5 menit sebelum (jam, menit) lokal,
+    lalu kembalikan pasangan (jam, menit) dalam UTC.
+    """
+    now_local = datetime.datetime.now(timezone)
+    target_local = now_local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    reminder_utc = (target_local - datetime.timedelta(minutes=5)).astimezone(pytz.utc)
+    return reminder_utc.hour, reminder_utc.minute
+
+def build_minute_index():
+    """
+    Kelompokkan seluruh entry SECTION_ENTRIES berdasarkan menit UTC pengingatnya.
+    Konversi zona waktu hanya dilakukan sekali per entry, bukan per chat.
     """
-    Untuk setiap (jam, menit, pesan) di REMINDER_SECTIONS[section],
-    hitung waktu pengingat 5 menit sebelum, konversi ke UTC, lalu run_daily.
-    Pastikan setiap job memiliki job_name yang unik agar tidak terjadi
-    collision jika ada dua reminder pada jam:menit yang sama.
+    index = {}
+    for section, entries in SECTION_ENTRIES.items():
+        for entry in entries:
+            key = reminder_utc_minute(entry.hour, entry.minute)
+            index.setdefault(key, {}).setdefault(section, []).append(entry)
+    return index
+
+def _dispatch_job_name(key) -> str:
+    return f"dispatch_{key[0]:02d}{key[1]:02d}"
+
+def _remove_dispatch_job(job_queue, key):
+    for old_job in job_queue.get_jobs_by_name(_dispatch_job_name(key)):
+        old_job.schedule_removal()
+
+def _add_dispatch_job(job_queue, key):
+    # Hapus job lama jika sudah ada (berdasarkan nama)
+    _remove_dispatch_job(job_queue, key)
+    job_queue.run_daily(
+        dispatch_minute,
+        time=datetime.time(key[0], key[1], tzinfo=pytz.utc),
+        name=_dispatch_job_name(key),
+        data=key,
+        # Default APScheduler (1 detik) membuang timer yang telat karena stall singkat di bawah
+        # LOOP_STALL_THRESHOLD; penjaga last_dispatch di dispatch_key mencegah kirim ganda
+        job_kwargs={"misfire_grace_time": int(CATCHUP_GRACE_MINUTES * 60), "coalesce": True},
+    )
+
+def install_reminder_dispatcher(application, timers: bool = True):
+    """
+    Pasang satu job run_daily untuk setiap menit UTC unik di minute_index.
+    Dipanggil sekali saat startup; aktivasi/reset section tidak menyentuh scheduler.
+    Worker non-leader (timers=False) hanya membangun index untuk detak dari leader.
     """
+    minute_index.clear()
+    minute_index.update(build_minute_index())
+    rebuild_dispatch_times()
+    if not timers:
+        return
+
     job_queue = application.job_queue
+    for key in sorted(minute_index):
+        _add_dispatch_job(job_queue, key)
+    logger.info("Dispatcher reminder terpasang: %d timer untuk %d section", len(minute_index), len(SECTION_ENTRIES))
 
-    # Pastikan ada list di user_jobs
-    user_jobs.setdefault(chat_id, [])
+def sync_dispatcher(application):
+    """
+    Bangun ulang minute_index dari SECTION_ENTRIES, lalu hanya tambah/hapus timer
+    untuk menit yang muncul atau hilang. Langganan chat tidak disentuh sama sekali.
+    """
+    old_keys = set(minute_index)
+    minute_index.clear()
+    minute_index.update(build_minute_index())
+    rebuild_dispatch_times()
+    new_keys = set(minute_index)
+    if not cluster.is_leader:
+        return 0, 0
 
-    for hour, minute, message in REMINDER_SECTIONS[section]:
-        # Ambil waktu sekarang di zona Asia/Jakarta, lalu set jam & menit target
-        now_local = datetime.datetime.now(timezone)
-        target_local = now_local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    job_queue = application.job_queue
+    for key in old_keys - new_keys:
+        _remove_dispatch_job(job_queue, key)
+    for key in new_keys - old_keys:
+        _add_dispatch_job(job_queue, key)
+    return len(new_keys - old_keys), len(old_keys - new_keys)
 
-        # Kurangi 5 menit untuk pengingat
-        reminder_local = target_local - datetime.timedelta(minutes=5)
+# -------------------------------------------------
+# Catch-up reminder yang terlewat (restart proses atau event loop tersendat)
+# -------------------------------------------------
+def rebuild_dispatch_times():
+    dispatch_times[:] = sorted(hour * 60 + minute for hour, minute in minute_index)
 
-        # Jika jamnya bergeser ke hari sebelumnya (misalnya target jam 00:03),
-        # kita lakukan localize agar ada tzinfo:
-        if reminder_local.tzinfo is None:
-            reminder_local = timezone.localize(reminder_local)
+def dispatch_keys_between(since: datetime.datetime, until: datetime.datetime) -> list:
+    """
+    Kunci menit UTC yang jadwalnya jatuh di (since, until], berurutan waktu,
+    sebagai pasangan (kunci, datetime UTC). Rentang yang melewati tengah malam
+    dipecah per hari; tiap hari cukup dua bisect pada dispatch_times.
+    """
+    result = []
+    day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= until:
+        lo, hi = 0, len(dispatch_times)
+        if day.date() == since.date():
+            lo = bisect.bisect_right(dispatch_times, since.hour * 60 + since.minute)
+        if day.date() == until.date():
+            hi = bisect.bisect_right(dispatch_times, until.hour * 60 + until.minute)
+        for minute_of_day in dispatch_times[lo:hi]:
+            key = divmod(minute_of_day, 60)
+            result.append((key, day + datetime.timedelta(minutes=minute_of_day)))
+        day += datetime.timedelta(days=1)
+    return result
+
+def collect_missed_reminders(bot_data: dict, since: datetime.datetime, until: datetime.datetime) -> dict:
+    """Satu lintasan atas index waktu: (chat_id, thread_id) -> [pesan belum selesai, urut jadwal]."""
+    digests = {}
+    for key, _ in dispatch_keys_between(since, until):
+        for section, entries in minute_index.get(key, {}).items():
+            for chat_id, thread_id in reminder_registry.subscribers(section).items():
+                due = due_reminders(bot_data, chat_id, section, entries)
+                if due:
+                    digests.setdefault((chat_id, thread_id), []).extend(due)
+    return digests
+
+def catch_up_reminders(application, trigger: str) -> int:
+    """
+    Kirim satu pesan ringkasan per chat untuk reminder yang terlewat sejak
+    dispatch terakhir (dibatasi CATCHUP_GRACE_MINUTES), lalu tandai rentang
+    tersebut sudah diproses agar dispatch_minute yang terlambat tidak mengirim ulang.
+    """
+    bot_data = application.bot_data
+    now = datetime.datetime.now(pytz.utc)
+    since = now - datetime.timedelta(minutes=min(CATCHUP_GRACE_MINUTES, 24 * 60))
+    last_dispatch = bot_data.get("last_dispatch")
+    if last_dispatch is not None:
+        since = max(since, datetime.datetime.fromtimestamp(last_dispatch, pytz.utc))
+    if since >= now:
+        return 0
+
+    digests = collect_missed_reminders(bot_data, since, now)
+    bot_data["last_dispatch"] = now.timestamp()
+
+    total = 0
+    for (chat_id, thread_id), messages in digests.items():
+        # Digabung oleh send_queue; dipecah otomatis jika melebihi MESSAGE_MAX_LENGTH
+        send_queue.enqueue(chat_id, f"⏰ {len(messages)} reminder terlewat:", thread_id=thread_id, coalesce_key=("catchup",))
+        for message in messages:
+            send_queue.enqueue(chat_id, f"🔔 {message}", thread_id=thread_id, coalesce_key=("catchup",))
+        total += len(messages)
+    if total:
+        MISSED_REMINDERS.inc(trigger, amount=total)
+    logger.info("Catch-up (%s): %d reminder terlewat untuk %d chat sejak %s", trigger, total, len(digests), since.isoformat())
+    return total
+
+class LoopWatchdog:
+    """
+    Task yang tidur LOOP_WATCHDOG_INTERVAL detik lalu mengukur seberapa terlambat
+    ia dibangunkan. Keterlambatan >= threshold dianggap stall dan memicu on_stall.
+    """
 
-        # Konversi ke UTC
-        reminder_utc_time = reminder_local.astimezone(pytz.utc).time()
+    def __init__(self, interval=LOOP_WATCHDOG_INTERVAL, threshold=LOOP_STALL_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent_stalls = collections.deque(maxlen=32)  # (epoch, lag detik)
+        self._on_stall = None
+        self._task = None
+
+    def start(self, on_stall=None):
+        self._on_stall = on_stall
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.recent_stalls.append((time.time(), lag))
+                logger.warning("Event loop tersendat %.2f detik", lag)
+                if self._on_stall is not None:
+                    try:
+                        self._on_stall(lag)
+                    except Exception:
+                        logger.exception("Gagal menjalankan penanganan stall")
+
+
+loop_watchdog = LoopWatchdog()
 
-        # Buat nama job yang unik dengan memasukkan message (sesudah disanitasi)
-        clean_msg = re.sub(r'\W+', '_', message)
-        job_name = f"reminder_{chat_id}_{section}_{hour:02d}{minute:02d}_{clean_msg}"
+# -------------------------------------------------
+# Jadwal eksternal: muat dari file, pantau perubahan, dan terapkan berdasarkan diff
+# -------------------------------------------------
+_TIME_PREFIX = re.compile(r"^\d{1,2}[:.]\d{2}\s+")
 
-        # Hapus job lama jika sudah ada (berdasarkan job_name)
-        for old_job in job_queue.get_jobs_by_name(job_name):
-            try:
-                old_job.schedule_removal()
-            except JobLookupError:
-                pass
-
-        # Jadwalkan job dengan fungsi 'reminder'
-        job = job_queue.run_daily(
-            reminder,
-            time=reminder_utc_time,
-            name=job_name,
-            data={
-                "chat_id": chat_id,
-                "message": message,
-                "section": section,
-                "thread_id": thread_id
-            }
+
+def _parse_entry(raw) -> tuple:
+    """Terima {"time": "HH:MM", "message": ...} atau [jam, menit, pesan]."""
+    if isinstance(raw, dict):
+        hour, minute = (int(part) for part in str(raw["time"]).split(":"))
+        message = str(raw["message"])
+    else:
+        hour, minute, message = int(raw[0]), int(raw[1]), str(raw[2])
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Waktu tidak valid untuk entry {message!r}")
+    return hour, minute, message
+
+
+def _validate_section_name(section: str):
+    if not section or "_" in section:
+        raise ValueError(f"Nama section {section!r} tidak boleh kosong atau mengandung '_'")
+    if len(section.encode()) > SECTION_NAME_MAX_BYTES:
+        raise ValueError(f"Nama section {section!r} melebihi {SECTION_NAME_MAX_BYTES} byte")
+
+
+def load_schedule_file(path: str) -> dict:
+    """Baca definisi jadwal menjadi {section: [(jam, menit, pesan), ...]}."""
+    if path.endswith((".sqlite3", ".sqlite", ".db")):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT section, time, message FROM schedule ORDER BY position, rowid").fetchall()
+        finally:
+            conn.close()
+        raw = {}
+        for section, at, message in rows:
+            raw.setdefault(section, []).append({"time": at, "message": message})
+    else:
+        with open(path, "rb") as f:
+            content = f.read()
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # opsional, hanya dibutuhkan untuk file YAML
+            raw = yaml.safe_load(content)
+        else:
+            raw = json_loads(content)
+
+    sections = {}
+    for section, entries in raw.items():
+        _validate_section_name(str(section))
+        parsed = [_parse_entry(entry) for entry in entries]
+        messages = [message for _, _, message in parsed]
+        if len(set(messages)) != len(messages):
+            raise ValueError(f"Pesan duplikat di section {section}")
+        sections[str(section)] = parsed
+    return sections
+
+
+def schedule_file_signature(path: str):
+    signature = []
+    for candidate in (path, f"{path}-wal"):
+        try:
+            stat = os.stat(candidate)
+        except FileNotFoundError:
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature) or None
+
+
+def diff_schedule(old_registry: dict, new_sections: dict, id_map: dict) -> dict:
+    """
+    Bandingkan jadwal berjalan dengan definisi baru. Entry dengan teks sama tapi
+    jam berbeda, atau pasangan hapus/tambah yang teksnya sama setelah prefix jam
+    dibuang, dihitung "moved" dan ID (serta status ✅-nya) dipertahankan.
+    id_map diperbarui di tempat untuk entry yang berganti teks.
+    """
+    summary = {"added": 0, "removed": 0, "moved": 0}
+    for section in set(old_registry) | set(new_sections):
+        old = {entry.message: entry for entry in old_registry.get(section, ())}
+        new = {message: (hour, minute) for hour, minute, message in new_sections.get(section, ())}
+        summary["moved"] += sum(
+            1 for message in old.keys() & new.keys() if (old[message].hour, old[message].minute) != new[message]
         )
+        removed = [message for message in old if message not in new]
+        added = [message for message in new if message not in old]
+
+        removed_by_label, added_by_label = {}, {}
+        for message in removed:
+            removed_by_label.setdefault(_TIME_PREFIX.sub("", message), []).append(message)
+        for message in added:
+            added_by_label.setdefault(_TIME_PREFIX.sub("", message), []).append(message)
+        ids = id_map.setdefault(section, {})
+        for label, old_messages in removed_by_label.items():
+            new_messages = added_by_label.get(label, [])
+            if len(old_messages) == 1 and len(new_messages) == 1:
+                ids[new_messages[0]] = ids.pop(old_messages[0], old[old_messages[0]].id)
+                removed.remove(old_messages[0])
+                added.remove(new_messages[0])
+                summary["moved"] += 1
+        summary["added"] += len(added)
+        summary["removed"] += len(removed)
+    return summary
+
+
+def reload_schedule(application, new_sections: dict) -> dict:
+    """Terapkan definisi jadwal baru: registry, ID stabil, dan hanya timer yang berubah."""
+    id_map = application.bot_data.setdefault("entry_ids", {})
+    if not id_map:
+        # Pertama kali: pakai alokasi ID yang sedang berjalan (posisi di REMINDER_SECTIONS)
+        id_map.update({section: dict(ids) for section, ids in ENTRY_IDS.items()})
+    summary = diff_schedule(SECTION_ENTRIES, new_sections, id_map)
+    apply_schedule(new_sections, id_map)
+    summary["jobs_added"], summary["jobs_removed"] = sync_dispatcher(application) if minute_index else (0, 0)
+    return summary
+
+
+# Tanda tangan SCHEDULE_FILE yang terakhir diterapkan di proses ini
+schedule_state = {"signature": None}
+
+
+async def watch_schedule(context: ContextTypes.DEFAULT_TYPE):
+    """Job berulang (hanya di leader): muat ulang SCHEDULE_FILE bila berubah."""
+    state = context.job.data
+    signature = schedule_file_signature(SCHEDULE_FILE)
+    if signature is None or signature == state.get("signature"):
+        return
+    state["signature"] = signature
+    try:
+        sections = load_schedule_file(SCHEDULE_FILE)
+    except Exception:
+        logger.exception("Gagal memuat %s, jadwal lama tetap dipakai", SCHEDULE_FILE)
+        return
+    summary = reload_schedule(context.application, sections)
+    logger.info(
+        "Jadwal dimuat ulang dari %s: +%d -%d ~%d entry, timer +%d -%d",
+        SCHEDULE_FILE, summary["added"], summary["removed"], summary["moved"],
+        summary["jobs_added"], summary["jobs_removed"],
+    )
+    if cluster.enabled:
+        await cluster.broadcast("reload", {})
+
+
+def load_initial_schedule(application, watch: bool = True):
+    """Muat SCHEDULE_FILE (jika ada) sebelum dispatcher dipasang, lalu pasang watcher."""
+    schedule_state["signature"] = schedule_file_signature(SCHEDULE_FILE)
+    sections = REMINDER_SECTIONS
+    if schedule_state["signature"] is not None:
+        try:
+            sections = load_schedule_file(SCHEDULE_FILE)
+        except Exception:
+            logger.exception("Gagal memuat %s, memakai REMINDER_SECTIONS bawaan", SCHEDULE_FILE)
+    reload_schedule(application, sections)
+    if watch:
+        start_schedule_watch(application)
+
+def start_schedule_watch(application):
+    application.job_queue.run_repeating(
+        watch_schedule, interval=SCHEDULE_POLL_INTERVAL, first=SCHEDULE_POLL_INTERVAL,
+        name="watch_schedule", data=schedule_state,
+    )
+
+# -------------------------------------------------
+# Fungsi utama untuk mengaktifkan semua reminder di satu section
+# -------------------------------------------------
+async def schedule_section_reminders(application: ApplicationBuilder, chat_id: int, section: str, thread_id=None):
+    """
+    Daftarkan chat sebagai subscriber section. Timer per menit sudah dipasang
+    oleh install_reminder_dispatcher, jadi di sini cukup memperbarui index.
+    """
+    reminder_registry.add(chat_id, section, thread_id)
 
-        user_jobs[chat_id].append(job)
+def unschedule_section_reminders(chat_id: int, section=None):
+    """Hapus chat dari index subscriber (satu section, atau semua jika section=None)."""
+    if section is None:
+        reminder_registry.remove_chat(chat_id)
+    else:
+        reminder_registry.remove(chat_id, section)
+
+def rehydrate_reminders(application):
+    """
+    Pulihkan langganan semua chat dari active_sections yang tersimpan di persistence.
+    Konversi zona waktu sudah dilakukan sekali di build_minute_index, jadi biaya
+    di sini hanya O(jumlah chat x section).
+    """
+    started = time.perf_counter()
+    active_sections = application.bot_data.get("active_sections", {})
+    count = reminder_registry.rehydrate(active_sections)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        "Rehydrasi reminder: %d langganan untuk %d chat dalam %.2f ms",
+        count, reminder_registry.chat_count(), elapsed_ms,
+    )
+    return elapsed_ms
 
 # -------------------------------------------------
 # Handler untuk melihat daftar section yang aktif beserta isi jadwalnya (/jadwalaktif)
@@ -323,34 +1936,20 @@ async def jadwal_aktif(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     active_dict = context.bot_data.get("active_sections", {}).get(chat_id, {})
 
-    # Cari section yang sedang aktif (value == True)
-    aktif_sections = [sec for sec, val in active_dict.items() if val]
+    # Cari section yang sedang aktif (value == True) dan masih ada di jadwal
+    aktif_sections = [sec for sec, val in active_dict.items() if val and sec in SECTION_ENTRIES]
 
     if not aktif_sections:
         # Jika tidak ada section aktif
         await update.message.reply_text("ℹ️ Tidak ada jadwal yang sedang aktif.")
         return
 
-    # Untuk setiap section aktif, kirim satu pesan dengan detail jadwal dan tombol interaktif
+    # Untuk setiap section aktif, kirim satu pesan dengan detail jadwal dan tombol interaktif.
+    # Dikirim berurutan agar urutan Pagi/Siang/Malam di chat tetap terjaga.
     for section in aktif_sections:
-        completed = context.bot_data.get("completed_tasks", {}).get(chat_id, set())
-
-        # Bangun header teks
-        lines = [f"📋 Jadwal *{section}* (Aktif):"]
-        keyboard = []
-        for h, m, msg in REMINDER_SECTIONS[section]:
-            status = "✅" if msg in completed else "❌"
-            lines.append(f"{status} {h:02d}:{m:02d} - {msg}")
-            # Tombol untuk toggle done/undone
-            keyboard.append([InlineKeyboardButton(f"{status} {h:02d}:{m:02d} - {msg}", callback_data=f"done_{section}_{msg}")])
-
-        # Tambahkan tombol Reset pada bagian bawah
-        keyboard.append([InlineKeyboardButton(f"❌ Reset {section}", callback_data=f"reset_{section}")])
-        # Tombol kembali ke menu utama
-        keyboard.append([InlineKeyboardButton("🔙 Kembali", callback_data="go_back")])
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text("\n".join(lines), parse_mode="Markdown", reply_markup=reply_markup)
+        mask = get_completed_mask(context.bot_data, chat_id, section)
+        text, reply_markup = render_section(section, mask, VIEW_ACTIVE)
+        await update.message.reply_text(text, parse_mode="Markdown", reply_markup=reply_markup)
 
 # -------------------------------------------------
 # Handler untuk error (jika terjadi exception)
@@ -368,21 +1967,17 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 # -------------------------------------------------
 async def reset_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    # Hentikan semua job untuk user ini
-    if chat_id in user_jobs:
-        for job in user_jobs[chat_id]:
-            try:
-                job.schedule_removal()
-            except JobLookupError:
-                pass
-        user_jobs[chat_id].clear()
+    # Hentikan semua reminder untuk chat ini
+    unschedule_section_reminders(chat_id)
 
     # Reset bot_data: active_sections & completed_tasks
     if "active_sections" in context.bot_data and chat_id in context.bot_data["active_sections"]:
         context.bot_data["active_sections"][chat_id].clear()
 
-    if "completed_tasks" in context.bot_data and chat_id in context.bot_data["completed_tasks"]:
-        context.bot_data["completed_tasks"][chat_id].clear()
+    # Lewat set_completed_mask agar status hari sebelumnya tetap masuk riwayat
+    for section in list(context.bot_data.get("completed_tasks", {}).get(chat_id, {})):
+        set_completed_mask(context.bot_data, chat_id, section, 0)
+    persistence.mark_dirty(chat_id)
 
     await update.message.reply_text("🔄 Semua tugas dan pengingat telah direset dan siap digunakan kembali.")
 
@@ -390,12 +1985,11 @@ async def reset_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Fungsi pembantu untuk menampilkan daftar jadwal + status (✅/❌) per section (digunakan oleh /jadwalpagi, /jadwalsiang, /jadwalmalam)
 # -------------------------------------------------
 def format_jadwal(chat_id, section, context):
-    completed = context.bot_data.get("completed_tasks", {}).get(chat_id, set())
-    lines = [f"📋 Jadwal *{section}*:"]
-    for h, m, msg in REMINDER_SECTIONS[section]:
-        status = "✅" if msg in completed else "❌"
-        lines.append(f"{status} {h:02d}:{m:02d} - {msg}")
-    return "\n".join(lines)
+    if section not in SECTION_ENTRIES:
+        return f"ℹ️ Jadwal *{section}* tidak tersedia."
+    mask = get_completed_mask(context.bot_data, chat_id, section)
+    text, _ = render_section(section, mask, VIEW_TEXT)
+    return text
 
 async def jadwal_pagi(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -412,75 +2006,960 @@ async def jadwal_malam(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = format_jadwal(chat_id, "Malam", context)
     await update.message.reply_text(text, parse_mode="Markdown")
 
+# -------------------------------------------------
+# /next dan /sisa: jadwal berikutnya & yang sudah lewat tapi belum selesai
+# -------------------------------------------------
+NEXT_LIMIT = 5
+
+
+def active_sections_for(bot_data: dict, chat_id: int) -> list:
+    active_dict = bot_data.get("active_sections", {}).get(chat_id, {})
+    return [sec for sec, val in active_dict.items() if val and sec in SECTION_TIMELINE]
+
+async def next_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    sections = active_sections_for(context.bot_data, chat_id)
+    if not sections:
+        await update.message.reply_text("ℹ️ Tidak ada jadwal yang sedang aktif.")
+        return
+
+    upcoming = upcoming_entries(context.bot_data, chat_id, sections, current_day_offset(), NEXT_LIMIT)
+    if not upcoming:
+        await update.message.reply_text("🎉 Tidak ada jadwal berikutnya yang belum selesai.")
+        return
+    lines = ["⏭️ Jadwal berikutnya:"]
+    for minutes, entry in upcoming:
+        lines.append(f"🔔 {entry.message} ({entry.section}, {minutes} menit lagi)")
+    await update.message.reply_text("\n".join(lines))
+
+async def sisa(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    sections = active_sections_for(context.bot_data, chat_id)
+    if not sections:
+        await update.message.reply_text("ℹ️ Tidak ada jadwal yang sedang aktif.")
+        return
+
+    offset = current_day_offset()
+    lines = ["⏳ Sudah lewat waktunya tapi belum selesai:"]
+    for section in sections:
+        overdue = overdue_entries(context.bot_data, chat_id, section, offset)
+        if overdue:
+            lines.append(f"\n*{section}*")
+            lines.extend(f"❌ {entry.message} ({minutes} menit lalu)" for minutes, entry in overdue)
+    if len(lines) == 1:
+        lines = ["🎉 Semua jadwal yang sudah lewat sudah selesai."]
+    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+
+# -------------------------------------------------
+# /riwayat: ringkasan penyelesaian tugas beberapa hari terakhir per section
+# -------------------------------------------------
+async def riwayat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    lines = [f"📊 Riwayat {HISTORY_DAYS} hari terakhir:"]
+    for section, entries in SECTION_ENTRIES.items():
+        history = completion_history(context.bot_data, chat_id, section)
+        if not history:
+            continue
+        lines.append(f"\n*{section}*")
+        for generation, mask in history:
+            done = sum(1 for entry in entries if is_done(mask, entry))
+            lines.append(f"{generation_date(generation):%d-%m-%Y}: {done}/{len(entries)} ✅")
+    if len(lines) == 1:
+        lines.append("Belum ada riwayat.")
+    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+
 # -------------------------------------------------
 # Handler untuk endpoint root (cek bot running)
 # -------------------------------------------------
 async def handle_root(request):
     return web.Response(text="Bot is running")
 
+# -------------------------------------------------
+# Endpoint /metrics (format teks Prometheus)
+# -------------------------------------------------
+def collect_gauges(application):
+    """Metrik yang dihitung saat scrape, bukan saat kejadian."""
+    yield "# HELP bot_update_queue_depth Jumlah update yang menunggu diproses"
+    yield "# TYPE bot_update_queue_depth gauge"
+    yield f"bot_update_queue_depth {application.update_queue.qsize()}"
+
+    yield "# HELP bot_send_queue_depth Jumlah pesan keluar yang menunggu dikirim"
+    yield "# TYPE bot_send_queue_depth gauge"
+    yield f"bot_send_queue_depth {send_queue.qsize()}"
+
+    yield "# HELP bot_scheduler_jobs Jumlah job di JobQueue"
+    yield "# TYPE bot_scheduler_jobs gauge"
+    yield f"bot_scheduler_jobs {len(application.job_queue.jobs())}"
+
+    # Agregat saja: label per chat_id membocorkan ID grup dan kardinalitasnya tak terbatas
+    yield "# HELP bot_subscribed_chats Jumlah chat yang punya minimal satu section aktif"
+    yield "# TYPE bot_subscribed_chats gauge"
+    yield f"bot_subscribed_chats {reminder_registry.chat_count()}"
+    scheduled = sum(
+        len(entries) * len(reminder_registry.subscribers(section)) for section, entries in SECTION_ENTRIES.items()
+    )
+    yield "# HELP bot_scheduled_reminders Total entry reminder terjadwal di semua chat"
+    yield "# TYPE bot_scheduled_reminders gauge"
+    yield f"bot_scheduled_reminders {scheduled}"
+
+    yield "# HELP bot_updates_total Update masuk per sumber dan hasil"
+    yield "# TYPE bot_updates_total counter"
+    for (source, event), value in ingest_stats.items():
+        yield f'bot_updates_total{{source="{source}",event="{event}"}} {value}'
+
+    yield "# HELP bot_update_queue_wait_seconds Waktu tunggu update di antrian per sumber"
+    yield "# TYPE bot_update_queue_wait_seconds summary"
+    for source, (count, total, _) in ingest_latency.items():
+        yield f'bot_update_queue_wait_seconds_count{{source="{source}"}} {count}'
+        yield f'bot_update_queue_wait_seconds_sum{{source="{source}"}} {total}'
+    yield "# HELP bot_update_queue_wait_max_seconds Waktu tunggu terlama di antrian per sumber"
+    yield "# TYPE bot_update_queue_wait_max_seconds gauge"
+    for source, (_, _, worst) in ingest_latency.items():
+        yield f'bot_update_queue_wait_max_seconds{{source="{source}"}} {worst}'
+
+    info = render_cache_info()
+    yield "# HELP bot_render_cache_total Hit/miss cache render section"
+    yield "# TYPE bot_render_cache_total counter"
+    yield f'bot_render_cache_total{{result="hit"}} {info.hits}'
+    yield f'bot_render_cache_total{{result="miss"}} {info.misses}'
+
+    if cluster.enabled:
+        yield "# HELP bot_cluster_worker Peran worker dalam mode multi-proses"
+        yield "# TYPE bot_cluster_worker gauge"
+        yield f'bot_cluster_worker{{leader="{int(cluster.is_leader)}"}} 1'
+
+    yield "# HELP bot_persistence_rows_written_total Baris SQLite yang ditulis persistence"
+    yield "# TYPE bot_persistence_rows_written_total counter"
+    yield f"bot_persistence_rows_written_total {persistence.rows_written}"
+    yield "# HELP bot_persistence_bytes_written_total Perkiraan byte yang ditulis persistence"
+    yield "# TYPE bot_persistence_bytes_written_total counter"
+    yield f"bot_persistence_bytes_written_total {persistence.bytes_written}"
+
+
+def with_worker_label(lines, index: int):
+    """Tambahkan label worker ke setiap sampel agar seri dari worker berbeda tidak bertabrakan."""
+    label = f'worker="{index}"'
+    for line in lines:
+        if line.startswith("#"):
+            yield line
+        elif "{" in line.split(" ", 1)[0]:
+            yield line.replace("{", "{" + label + ",", 1)
+        else:
+            name, value = line.split(" ", 1)
+            yield f"{name}{{{label}}} {value}"
+
+def merge_metric_families(blocks) -> list:
+    """Gabungkan output beberapa worker: HELP/TYPE sekali per metrik, sampelnya dikelompokkan."""
+    families = {}
+    family = None
+    for lines in blocks:
+        for line in lines:
+            if line.startswith("# "):
+                family = families.setdefault(line.split(" ", 3)[2], [])
+                if line not in family:
+                    family.append(line)
+            elif line:
+                family.append(line)
+    return [line for lines in families.values() for line in lines]
+
+def render_local_metrics(application) -> list:
+    lines = []
+    for metric in (HANDLER_LATENCY, HANDLER_ERRORS, REMINDER_SKEW, SEND_LATENCY, SEND_ERRORS, EDIT_EVENTS,
+                   EDIT_BYTES, MISSED_REMINDERS, LOOP_LAG):
+        lines.extend(metric.render())
+    lines.extend(collect_gauges(application))
+    if cluster.enabled:
+        lines = list(with_worker_label(lines, cluster.index))
+    return lines
+
+async def handle_cluster_metrics(request):
+    return web.Response(text="\n".join(render_local_metrics(request.app["application"])) + "\n")
+
+async def handle_metrics(request):
+    if not is_admin_request(request):
+        return web.Response(status=403)
+    blocks = [render_local_metrics(request.app["application"])]
+    if cluster.enabled:
+        # Kernel membagi koneksi port publik ke worker mana saja (reuse_port); agar tiap
+        # scrape lengkap dan konsisten, worker penerima mengumpulkan metrik semua worker
+        peers = [index for index in range(cluster.count) if index != cluster.index]
+        results = await asyncio.gather(*(cluster.call(index, "POST", "/cluster/metrics") for index in peers))
+        up = [f'bot_cluster_worker_up{{worker="{cluster.index}"}} 1']
+        for index, result in zip(peers, results):
+            ok = result is not None and result[0] == 200
+            if ok:
+                blocks.append(result[2].decode().splitlines())
+            up.append(f'bot_cluster_worker_up{{worker="{index}"}} {int(ok)}')
+        blocks.append([
+            "# HELP bot_cluster_worker_up Apakah metrik worker berhasil dikumpulkan pada scrape ini",
+            "# TYPE bot_cluster_worker_up gauge",
+            *up,
+        ])
+    lines = merge_metric_families(blocks)
+    return web.Response(text="\n".join(lines) + "\n", content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+# -------------------------------------------------
+# Jalur masuk update: validasi secret token, dedup update_id, dan batas antrian
+# -------------------------------------------------
+class UpdateDeduplicator:
+    """Jendela terbatas berisi update_id terakhir yang sudah diterima."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._order = collections.deque()
+        self._seen = set()
+
+    def seen(self, update_id: int) -> bool:
+        return update_id in self._seen
+
+    def remember(self, update_id: int):
+        """Catat update_id; dipanggil hanya setelah update benar-benar masuk antrian."""
+        if update_id in self._seen:
+            return
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self.window:
+            self._seen.discard(self._order.popleft())
+
+
+update_dedup = UpdateDeduplicator(UPDATE_DEDUP_WINDOW)
+# Counter (sumber, event); event loop single-thread sehingga tidak perlu lock
+ingest_stats = collections.Counter()
+# Latensi masuk-antrian -> mulai diproses, per sumber: [jumlah, total detik, maks detik]
+ingest_latency = {}
+# update_id -> (sumber, waktu masuk antrian)
+_enqueued_at = {}
+
+
+def enqueue_update(application, tg_update: Update, source: str = "webhook") -> bool:
+    """
+    Masukkan update ke update_queue. True jika update diterima atau duplikat;
+    False jika antrian penuh, sehingga pengirim harus mengirim ulang nanti.
+    update_id baru dicatat di jendela dedup setelah masuk antrian.
+    """
+    if update_dedup.seen(tg_update.update_id):
+        ingest_stats[(source, "duplicate")] += 1
+        return True
+    try:
+        application.update_queue.put_nowait(tg_update)
+    except asyncio.QueueFull:
+        ingest_stats[(source, "shed")] += 1
+        logger.warning("update_queue penuh, update %s ditolak", tg_update.update_id)
+        return False
+    update_dedup.remember(tg_update.update_id)
+    ingest_stats[(source, "accepted")] += 1
+    _enqueued_at[tg_update.update_id] = (source, time.monotonic())
+    return True
+
+
+async def track_ingest_latency(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler grup -1: catat berapa lama update menunggu di antrian sebelum diproses."""
+    entry = _enqueued_at.pop(update.update_id, None)
+    if entry is None:
+        return
+    source, enqueued = entry
+    waited = time.monotonic() - enqueued
+    stats = ingest_latency.setdefault(source, [0, 0.0, 0.0])
+    stats[0] += 1
+    stats[1] += waited
+    stats[2] = max(stats[2], waited)
+
+
+async def ingest_update(application, tg_update: Update, source: str) -> bool:
+    """Antrikan secara lokal, atau teruskan ke worker pemilik chat; False = pengirim harus mengulang."""
+    if cluster.enabled and not cluster.owns_update(tg_update):
+        # Chat milik worker lain: teruskan lewat Unix socket, dedup dilakukan di sana
+        return await cluster.forward_update(tg_update, source)
+    return enqueue_update(application, tg_update, source)
+
 # -------------------------------------------------
 # Handler untuk webhook Telegram
 # -------------------------------------------------
 async def handle_webhook(request):
+    ingest_stats[("webhook", "received")] += 1
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if WEBHOOK_SECRET and not hmac.compare_digest(token, WEBHOOK_SECRET):
+        ingest_stats[("webhook", "rejected")] += 1
+        return web.Response(status=403)
+
     application = request.app["application"]
-    update = await request.json()
-    from telegram import Update as TgUpdate
-    tg_update = TgUpdate.de_json(update, application.bot)
-    await application.update_queue.put(tg_update)
+    try:
+        tg_update = Update.de_json(json_loads(await request.read()), application.bot)
+    except Exception:
+        ingest_stats[("webhook", "invalid")] += 1
+        logger.warning("Payload webhook tidak valid diabaikan")
+        return web.Response()
+
+    # Decode & enqueue selesai sebelum membalas: 200 hanya untuk update yang benar-benar
+    # masuk antrian; selain itu 503 agar Telegram mengirim ulang (backpressure)
+    if not await ingest_update(application, tg_update, "webhook"):
+        return web.Response(status=503)
     return web.Response()
 
 # -------------------------------------------------
-# Fungsi utama: membangun aplikasi, menambahkan handler, dan menjalankan webhook/server
+# Mode polling (getUpdates) sebagai alternatif webhook, bisa ditukar saat runtime
 # -------------------------------------------------
-async def main():
-    application = (
+class IngestController:
+    """
+    Mengatur sumber update: "webhook" atau "polling". Kedua mode memakai
+    enqueue_update sehingga dedup, batas antrian dan statistiknya sama.
+    Offset polling disimpan di bot_data["polling_offset"] agar bertahan restart.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.mode = None
+        self._poll_task = None
+
+    async def use_webhook(self, url: str):
+        await self._stop_polling()
+        await self.application.bot.set_webhook(url, secret_token=WEBHOOK_SECRET)
+        self.mode = "webhook"
+        logger.info("Mode ingest: webhook (%s)", url)
+
+    async def use_polling(self):
+        if self._poll_task is not None:
+            return
+        # getUpdates ditolak Telegram selama webhook masih terpasang
+        await self.application.bot.delete_webhook()
+        self._poll_task = asyncio.create_task(self._poll_loop())
+        self.mode = "polling"
+        logger.info("Mode ingest: polling (timeout %ss, batch %d)", POLL_TIMEOUT, POLL_BATCH_LIMIT)
+
+    async def stop(self):
+        await self._stop_polling()
+        self.mode = None
+
+    async def _stop_polling(self):
+        task, self._poll_task = self._poll_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _poll_loop(self):
+        bot = self.application.bot
+        bot_data = self.application.bot_data
+        queue = self.application.update_queue
+        backoff = 1
+        while True:
+            # Backpressure: ambil hanya sebanyak slot antrian yang masih kosong
+            limit = POLL_BATCH_LIMIT
+            if queue.maxsize > 0:
+                limit = min(limit, queue.maxsize - queue.qsize())
+                if limit <= 0:
+                    await asyncio.sleep(0.1)
+                    continue
+            try:
+                updates = await bot.get_updates(
+                    offset=bot_data.get("polling_offset"),
+                    limit=limit,
+                    timeout=POLL_TIMEOUT,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            except asyncio.CancelledError:
+                raise
+            except RetryAfter as exc:
+                retry_after = exc.retry_after
+                if isinstance(retry_after, datetime.timedelta):
+                    retry_after = retry_after.total_seconds()
+                await asyncio.sleep(retry_after)
+                continue
+            except TelegramError as exc:
+                ingest_stats[("polling", "error")] += 1
+                logger.warning("getUpdates gagal: %s (coba lagi dalam %ss)", exc, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            except Exception:
+                # Error tak terduga (parse, httpx, ...) tidak boleh menghentikan polling selamanya
+                ingest_stats[("polling", "error")] += 1
+                logger.exception("getUpdates gagal tak terduga (coba lagi dalam %ss)", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+
+            backoff = 1
+            ingest_stats[("polling", "batches")] += 1
+            for tg_update in updates:
+                ingest_stats[("polling", "received")] += 1
+                try:
+                    accepted = await ingest_update(self.application, tg_update, "polling")
+                except Exception:
+                    logger.exception("Gagal memproses update %s dari getUpdates", tg_update.update_id)
+                    accepted = False
+                if not accepted:
+                    # Offset berhenti di update yang ditolak; sisanya diambil ulang pada getUpdates berikutnya
+                    await asyncio.sleep(0.5)
+                    break
+                bot_data["polling_offset"] = tg_update.update_id + 1
+
+# -------------------------------------------------
+# Endpoint admin untuk menukar mode ingest saat runtime (POST /admin/ingest/{mode})
+# -------------------------------------------------
+def is_admin_request(request) -> bool:
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get("X-Admin-Token", "")
+    authorization = request.headers.get("Authorization", "")
+    if not token and authorization.startswith("Bearer "):
+        # Prometheus mengirim token lewat `authorization: {credentials: ...}`
+        token = authorization[len("Bearer "):]
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
+async def proxy_to_worker(request, index: int):
+    """Teruskan request admin ke worker `index` lewat Unix socket-nya; token admin ikut diteruskan."""
+    headers = {name: request.headers[name] for name in ("X-Admin-Token", "Authorization") if name in request.headers}
+    query = {key: value for key, value in request.query.items() if key != "worker"}
+    result = await cluster.call(
+        index, request.method, request.path, query=query, headers=headers,
+        timeout=ClientTimeout(total=PROFILE_MAX_SECONDS + 10),
+    )
+    if result is None:
+        return web.Response(status=502, text=f"worker {index} tidak menjawab")
+    status, content_type, body = result
+    return web.Response(status=status, body=body, headers={"Content-Type": content_type} if content_type else None)
+
+async def forward_to_requested_worker(request):
+    """
+    Endpoint diagnostik bersifat per proses: ?worker=N meneruskannya ke worker N.
+    None berarti request dijawab oleh worker yang menerimanya.
+    """
+    raw = request.query.get("worker")
+    if raw is None or not cluster.enabled:
+        return None
+    try:
+        index = int(raw)
+    except ValueError:
+        index = -1
+    if not 0 <= index < cluster.count:
+        return web.Response(status=400, text=f"worker harus 0..{cluster.count - 1}")
+    if index == cluster.index:
+        return None
+    return await proxy_to_worker(request, index)
+
+async def handle_ingest_mode(request):
+    if not is_admin_request(request):
+        return web.Response(status=403)
+    if not cluster.is_leader:
+        # Hanya leader yang boleh memegang getUpdates/setWebhook: teruskan ke leader
+        leader = cluster.leader_index()
+        if leader is None or leader == cluster.index:
+            return web.Response(status=503, text="belum ada leader, coba lagi")
+        return await proxy_to_worker(request, leader)
+    controller = request.app["ingest"]
+    mode = request.match_info["mode"]
+    if mode == "polling":
+        await controller.use_polling()
+    elif mode == "webhook":
+        url = request.query.get("url") or WEBHOOK_URL
+        if not url:
+            return web.Response(status=400, text="WEBHOOK_URL_BASE tidak diset dan ?url= kosong")
+        await controller.use_webhook(url)
+    else:
+        return web.Response(status=404)
+    return web.Response(text=f"mode={controller.mode}")
+
+# -------------------------------------------------
+# Endpoint admin diagnostik: profil sampling sesuai permintaan, lag event loop,
+# dan panggilan handler terlambat. Tidak ada hook apa pun saat tidak dipanggil.
+# -------------------------------------------------
+class SamplingProfiler:
+    """
+    Profiler sampling: sebuah thread membaca stack thread event loop lewat
+    sys._current_frames() setiap `interval` detik selama `seconds` detik.
+    Hanya satu profil boleh berjalan pada satu waktu.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def _sample(self, thread_id: int, seconds: float, interval: float) -> collections.Counter:
+        stacks = collections.Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                stacks[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return stacks
+
+    async def profile(self, seconds: float, interval: float):
+        """Kembalikan Counter stack ("root;...;leaf" -> sampel), atau None jika profil lain sedang berjalan."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return await asyncio.to_thread(self._sample, threading.get_ident(), seconds, interval)
+        finally:
+            self._busy.release()
+
+
+profiler = SamplingProfiler()
+
+
+def format_profile(stacks: collections.Counter, limit: int = 25) -> str:
+    total = sum(stacks.values())
+    own = collections.Counter()
+    inclusive = collections.Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    lines = [f"# {total} sampel" + (f", worker {cluster.index}" if cluster.enabled else "")]
+    lines.append("\n# self (fungsi yang sedang berjalan)")
+    lines.extend(f"{count * 100 / total:6.2f}%  {frame}" for frame, count in own.most_common(limit))
+    lines.append("\n# inklusif")
+    lines.extend(f"{count * 100 / total:6.2f}%  {frame}" for frame, count in inclusive.most_common(limit))
+    return "\n".join(lines)
+
+async def handle_admin_profile(request):
+    if not is_admin_request(request):
+        return web.Response(status=403)
+    forwarded = await forward_to_requested_worker(request)
+    if forwarded is not None:
+        return forwarded
+    try:
+        seconds = min(max(float(request.query.get("seconds", 10)), 0.1), PROFILE_MAX_SECONDS)
+        interval = max(float(request.query.get("interval", 0.005)), 0.001)
+    except ValueError:
+        return web.Response(status=400, text="seconds/interval harus angka")
+    stacks = await profiler.profile(seconds, interval)
+    if stacks is None:
+        return web.Response(status=409, text="profil lain sedang berjalan")
+    if not stacks:
+        return web.Response(text="# 0 sampel")
+    if request.query.get("format") == "collapsed":
+        # Format collapsed untuk flamegraph.pl / speedscope
+        return web.Response(text="\n".join(f"{stack} {count}" for stack, count in stacks.most_common()))
+    return web.Response(text=format_profile(stacks))
+
+async def handle_admin_loop(request):
+    if not is_admin_request(request):
+        return web.Response(status=403)
+    forwarded = await forward_to_requested_worker(request)
+    if forwarded is not None:
+        return forwarded
+    report = {
+        "worker": cluster.index,
+        "interval_s": loop_watchdog.interval,
+        "stall_threshold_s": loop_watchdog.threshold,
+        "last_lag_s": round(loop_watchdog.last_lag, 6),
+        "max_lag_s": round(loop_watchdog.max_lag, 6),
+        "samples": LOOP_LAG.count(),
+        "stalls": loop_watchdog.stalls,
+        "recent_stalls": [
+            {"at": datetime.datetime.fromtimestamp(at, timezone).isoformat(), "lag_s": round(lag, 3)}
+            for at, lag in loop_watchdog.recent_stalls
+        ],
+    }
+    if request.query.get("reset") == "1":
+        loop_watchdog.max_lag = 0.0
+    return web.json_response(report)
+
+async def handle_admin_slow(request):
+    if not is_admin_request(request):
+        return web.Response(status=403)
+    forwarded = await forward_to_requested_worker(request)
+    if forwarded is not None:
+        return forwarded
+    try:
+        limit = int(request.query.get("limit", 20))
+    except ValueError:
+        return web.Response(status=400, text="limit harus angka")
+    slowest = sorted(recent_calls, key=lambda call: call[0], reverse=True)[:limit]
+    return web.json_response({
+        "worker": cluster.index,
+        "window": len(recent_calls),
+        "calls": [
+            {
+                "handler": name,
+                "update_type": kind,
+                "duration_ms": round(elapsed * 1000, 3),
+                "at": datetime.datetime.fromtimestamp(finished, timezone).isoformat(),
+            }
+            for elapsed, name, kind, finished in slowest
+        ],
+    })
+
+# -------------------------------------------------
+# Mode multi-proses: worker dibagi per chat_id, satu leader memegang timer
+# reminder, watcher jadwal dan ingest (getUpdates/setWebhook). Koordinasi
+# hanya lewat file lock dan Unix socket di CLUSTER_DIR.
+# -------------------------------------------------
+def update_shard_key(tg_update: Update) -> int:
+    if tg_update.effective_chat is not None:
+        return tg_update.effective_chat.id
+    if tg_update.effective_user is not None:
+        return tg_update.effective_user.id
+    return tg_update.update_id
+
+
+class ClusterNode:
+    """
+    Peran proses ini di antara WORKERS worker. Dengan satu worker semuanya
+    no-op dan proses ini otomatis leader, jadi mode lama tidak berubah.
+    """
+
+    def __init__(self, index: int, count: int, directory: str):
+        self.index = index
+        self.count = count
+        self.directory = directory
+        self.is_leader = count == 1
+        self.ingest = None
+        self._lock_fd = None
+        self._sessions = {}
+        self._runner = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 1
+
+    def owner_of(self, chat_id: int) -> int:
+        return chat_id % self.count
+
+    def owns_update(self, tg_update: Update) -> bool:
+        return self.owner_of(update_shard_key(tg_update)) == self.index
+
+    def socket_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"worker-{index}.sock")
+
+    # -- pemilihan leader -------------------------------------------------------
+    def try_lead(self) -> bool:
+        """Ambil flock non-blocking; lock lepas otomatis jika proses leader mati."""
+        if self.is_leader:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{self.index} {os.getpid()}\n".encode())
+        self._lock_fd = fd
+        self.is_leader = True
+        return True
+
+    def leader_index(self):
+        """Index leader menurut isi leader.lock; None jika belum pernah ada leader."""
+        try:
+            with open(os.path.join(self.directory, "leader.lock")) as f:
+                return int(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    # -- server & klien Unix socket ----------------------------------------------
+    async def serve(self, application):
+        """Endpoint internal; sengaja terpisah dari aplikasi aiohttp publik."""
+        app = web.Application()
+        app["application"] = application
+        app["ingest"] = self.ingest
+        app.add_routes([
+            web.post("/cluster/update", handle_cluster_update),
+            web.post("/cluster/dispatch", handle_cluster_dispatch),
+            web.post("/cluster/reload", handle_cluster_reload),
+            web.post("/cluster/catchup", handle_cluster_catchup),
+            web.post("/cluster/metrics", handle_cluster_metrics),
+            # Tujuan proxy dari worker lain (?worker=N, /admin/ingest ke leader)
+            web.get("/admin/profile", handle_admin_profile),
+            web.get("/admin/loop", handle_admin_loop),
+            web.get("/admin/slow", handle_admin_slow),
+            web.post("/admin/ingest/{mode}", handle_ingest_mode),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        path = self.socket_path(self.index)
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        await web.UnixSite(self._runner, path).start()
+        os.chmod(path, 0o600)
+
+    async def call(self, index: int, method: str, path: str, body: bytes = b"", query=None, headers=None, timeout=None):
+        """Request ke worker lain; (status, content-type, body) atau None jika koneksi gagal."""
+        session = self._sessions.get(index)
+        if session is None or session.closed:
+            session = self._sessions[index] = ClientSession(
+                connector=UnixConnector(path=self.socket_path(index)), timeout=ClientTimeout(total=5),
+            )
+        extra = {} if timeout is None else {"timeout": timeout}
+        try:
+            async with session.request(
+                method, f"http://worker-{index}{path}", data=body, params=query, headers=headers, **extra,
+            ) as response:
+                return response.status, response.headers.get("Content-Type"), await response.read()
+        except (ClientError, asyncio.TimeoutError, OSError) as exc:
+            logger.warning("Gagal memanggil %s di worker %d: %s", path, index, exc)
+            return None
+
+    async def send(self, index: int, op: str, body: bytes) -> bool:
+        result = await self.call(index, "POST", f"/cluster/{op}", body)
+        return result is not None and result[0] == 200
+
+    async def broadcast(self, op: str, payload: dict):
+        body = json.dumps(payload).encode()
+        await asyncio.gather(*(self.send(i, op, body) for i in range(self.count) if i != self.index))
+
+    async def forward_update(self, tg_update: Update, source: str) -> bool:
+        """True hanya jika worker pemilik menerima update (bukan 503/gagal koneksi)."""
+        ok = await self.send(self.owner_of(update_shard_key(tg_update)), "update", tg_update.to_json().encode())
+        ingest_stats[(source, "forwarded" if ok else "forward_failed")] += 1
+        return ok
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+cluster = ClusterNode(int(WORKER_INDEX or 0), WORKERS, CLUSTER_DIR)
+
+
+async def handle_cluster_update(request):
+    application = request.app["application"]
+    try:
+        tg_update = Update.de_json(json_loads(await request.read()), application.bot)
+    except Exception:
+        ingest_stats[("cluster", "invalid")] += 1
+        return web.Response(status=400)
+    if not enqueue_update(application, tg_update, "cluster"):
+        return web.Response(status=503)
+    return web.Response()
+
+async def handle_cluster_dispatch(request):
+    payload = json_loads(await request.read())
+    dispatch_key(request.app["application"].bot_data, tuple(payload["key"]), payload["scheduled_at"])
+    return web.Response()
+
+async def handle_cluster_reload(request):
+    schedule_state["signature"] = schedule_file_signature(SCHEDULE_FILE)
+    try:
+        sections = load_schedule_file(SCHEDULE_FILE)
+    except Exception:
+        logger.exception("Gagal memuat %s, jadwal lama tetap dipakai", SCHEDULE_FILE)
+        return web.Response(status=500)
+    reload_schedule(request.app["application"], sections)
+    return web.Response()
+
+async def handle_cluster_catchup(request):
+    catch_up_reminders(request.app["application"], "leader")
+    return web.Response()
+
+async def become_leader(application):
+    """Dipanggil saat worker ini mengambil alih peran leader dari worker yang mati."""
+    install_reminder_dispatcher(application)
+    # Menit yang lewat selama tidak ada leader tidak pernah di-dispatch: kejar di semua worker
+    catch_up_reminders(application, "leader")
+    await cluster.broadcast("catchup", {})
+    start_schedule_watch(application)
+    if cluster.ingest is not None:
+        await start_ingest(cluster.ingest)
+    logger.info("Worker %d sekarang leader", cluster.index)
+
+async def elect_leader(context: ContextTypes.DEFAULT_TYPE):
+    """Job berulang di worker non-leader: coba ambil lock leader."""
+    if cluster.try_lead():
+        context.job.schedule_removal()
+        await become_leader(context.application)
+
+def run_supervisor():
+    """
+    Proses induk untuk WORKERS > 1: migrasi data lama sekali, jalankan worker
+    (file ini dengan WORKER_INDEX) dan hidupkan ulang worker yang berhenti.
+    """
+    os.makedirs(CLUSTER_DIR, exist_ok=True)
+    persistence._migrate_legacy_pickle()
+    persistence._conn.close()
+    persistence._conn = None
+
+    procs = {}
+    stopping = False
+
+    def spawn(index: int):
+        env = dict(os.environ, WORKERS=str(WORKERS), WORKER_INDEX=str(index))
+        procs[index] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        logger.info("Worker %d dijalankan (pid %d)", index, procs[index].pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in procs.values():
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(WORKERS):
+        spawn(index)
+    while not stopping:
+        time.sleep(1)
+        for index, proc in list(procs.items()):
+            if proc.poll() is not None and not stopping:
+                logger.warning("Worker %d berhenti (kode %s), dijalankan ulang", index, proc.returncode)
+                spawn(index)
+    for proc in procs.values():
+        proc.wait()
+
+# -------------------------------------------------
+# Fungsi pembangun: aplikasi Telegram, startup bot, dan aplikasi aiohttp
+# -------------------------------------------------
+def build_request(pool_size: int) -> HTTPXRequest:
+    """HTTPXRequest dengan ukuran pool, keep-alive dan timeout dari konfigurasi."""
+    return HTTPXRequest(
+        connection_pool_size=pool_size,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        write_timeout=HTTP_WRITE_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        httpx_kwargs={"limits": httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=min(HTTP_KEEPALIVE_CONNECTIONS, pool_size),
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )},
+    )
+
+async def prewarm_connections(bot, count: int = HTTP_PREWARM_CONNECTIONS):
+    """
+    Buka `count` koneksi keep-alive ke Bot API dengan getMe paralel, agar
+    reminder pertama setelah boot tidak menunggu handshake TCP/TLS.
+    """
+    if count <= 0:
+        return
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bot.get_me() for _ in range(count)), return_exceptions=True)
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    logger.info("Pre-warm %d koneksi Bot API dalam %.0f ms (%d gagal)",
+                count, (time.perf_counter() - started) * 1000, failed)
+
+def build_application(request: HTTPXRequest = None, get_updates_request: HTTPXRequest = None):
+    builder = (
         ApplicationBuilder()
         .token(TOKEN)
         .persistence(persistence)
-        .build()
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_MAXSIZE))
     )
+    if request is not None:
+        builder = builder.request(request)
+    if get_updates_request is not None:
+        builder = builder.get_updates_request(get_updates_request)
+    if TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(TELEGRAM_API_BASE_URL)
+    application = builder.build()
 
     # Tambahkan handler perintah
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("reset", reset_all))
-    application.add_handler(CommandHandler("jadwalaktif", jadwal_aktif))
-    application.add_handler(CommandHandler("jadwalpagi", jadwal_pagi))
-    application.add_handler(CommandHandler("jadwalsiang", jadwal_siang))
-    application.add_handler(CommandHandler("jadwalmalam", jadwal_malam))
+    application.add_handler(CommandHandler("start", instrument("start", start)))
+    application.add_handler(CommandHandler("reset", instrument("reset_all", reset_all)))
+    application.add_handler(CommandHandler("jadwalaktif", instrument("jadwal_aktif", jadwal_aktif)))
+    application.add_handler(CommandHandler("jadwalpagi", instrument("jadwal_pagi", jadwal_pagi)))
+    application.add_handler(CommandHandler("jadwalsiang", instrument("jadwal_siang", jadwal_siang)))
+    application.add_handler(CommandHandler("jadwalmalam", instrument("jadwal_malam", jadwal_malam)))
+    application.add_handler(CommandHandler("riwayat", instrument("riwayat", riwayat)))
+    application.add_handler(CommandHandler("next", instrument("next", next_reminders)))
+    application.add_handler(CommandHandler("sisa", instrument("sisa", sisa)))
 
     # Tambahkan handler CallbackQuery (tombol interaktif)
-    application.add_handler(CallbackQueryHandler(section_handler, pattern="^section_"))
-    application.add_handler(CallbackQueryHandler(activate_section, pattern="^activate_"))
-    application.add_handler(CallbackQueryHandler(reset_section, pattern="^reset_"))
-    application.add_handler(CallbackQueryHandler(mark_done, pattern="^done_"))
-    application.add_handler(CallbackQueryHandler(go_back, pattern="^go_back$"))
+    application.add_handler(CallbackQueryHandler(instrument("section_handler", section_handler), pattern="^section_"))
+    application.add_handler(CallbackQueryHandler(instrument("activate_section", activate_section), pattern="^activate_"))
+    application.add_handler(CallbackQueryHandler(instrument("reset_section", reset_section), pattern="^reset_"))
+    application.add_handler(CallbackQueryHandler(instrument("mark_done", mark_done), pattern="^done_"))
+    application.add_handler(CallbackQueryHandler(instrument("change_page", change_page), pattern="^page_"))
+    application.add_handler(CallbackQueryHandler(instrument("go_back", go_back), pattern="^go_back$"))
+
+    # Catat latensi antrian update (webhook maupun polling) sebelum handler lain
+    application.add_handler(TypeHandler(Update, track_ingest_latency), group=-1)
 
     application.add_error_handler(error_handler)
+    return application
 
+async def start_bot(application):
     # Jalankan inisialisasi & start bot Telegram
     await application.initialize()
+    # bot_data tidak dimuat PTB (lihat SqlitePersistence); isi sebelum handler/job berjalan
+    await persistence.attach_bot_data(application.bot_data)
     await application.start()
 
     # Setelah bot Telegram berjalan, jalankan JobQueue
     await application.job_queue.start()
+    application.job_queue.run_repeating(
+        persist_bot_data, interval=PERSISTENCE_INTERVAL, first=PERSISTENCE_INTERVAL, name="persist_bot_data",
+    )
+
+    # Muat jadwal eksternal, lalu pasang timer dispatcher (satu per menit UTC unik) dan antrian kirim.
+    # Dalam mode multi-proses hanya leader yang memasang timer & watcher.
+    leader = cluster.try_lead()
+    load_initial_schedule(application, watch=leader)
+    install_reminder_dispatcher(application, timers=leader)
+    rehydrate_reminders(application)
+    await prewarm_connections(application.bot)
+    send_queue.start(application.bot)
+    if not leader:
+        application.job_queue.run_repeating(
+            elect_leader, interval=LEADER_RETRY_INTERVAL, first=LEADER_RETRY_INTERVAL, name="elect_leader",
+        )
+
+    # Kirim ringkasan reminder yang terlewat selama bot mati, lalu pantau stall event loop
+    catch_up_reminders(application, "startup")
+    loop_watchdog.start(lambda lag: catch_up_reminders(application, "stall"))
 
-    # Siapkan aiohttp untuk webhook (jika menggunakan metode webhook)
+def build_web_app(application):
+    # Siapkan aiohttp untuk webhook, metrik, dan endpoint admin
     app = web.Application()
     app["application"] = application
+    app["ingest"] = IngestController(application)
     app.add_routes([
         web.get("/", handle_root),
+        web.get("/admin/profile", handle_admin_profile),
+        web.get("/admin/loop", handle_admin_loop),
+        web.get("/admin/slow", handle_admin_slow),
+        web.get("/metrics", handle_metrics),
         web.post(WEBHOOK_PATH, handle_webhook),
+        web.post("/admin/ingest/{mode}", handle_ingest_mode),
     ])
+    return app
 
-    if WEBHOOK_URL:
-        await application.bot.set_webhook(WEBHOOK_URL)
+# -------------------------------------------------
+# Fungsi utama: membangun aplikasi, menambahkan handler, dan menjalankan webhook/server
+# -------------------------------------------------
+async def start_ingest(ingest):
+    use_webhook = INGEST_MODE == "webhook" or (INGEST_MODE == "auto" and WEBHOOK_URL)
+    if use_webhook and WEBHOOK_URL:
+        try:
+            await ingest.use_webhook(WEBHOOK_URL)
+        except TelegramError:
+            logger.exception("set_webhook gagal, beralih ke mode polling")
+            await ingest.use_polling()
     else:
-        logging.warning("⚠️ WEBHOOK_URL_BASE environment variable tidak diset, webhook tidak aktif!")
+        if use_webhook:
+            logging.warning("⚠️ WEBHOOK_URL_BASE environment variable tidak diset, webhook tidak aktif!")
+        await ingest.use_polling()
+
+async def main():
+    application = build_application(
+        request=build_request(max(HTTP_POOL_SIZE, SEND_WORKERS + 1)),
+        get_updates_request=build_request(HTTP_GET_UPDATES_POOL_SIZE),
+    )
+    await start_bot(application)
+
+    app = build_web_app(application)
+    cluster.ingest = app["ingest"]
+    if cluster.is_leader:
+        await start_ingest(app["ingest"])
+    if cluster.enabled:
+        await cluster.serve(application)
+        logger.info("Worker %d/%d berjalan (%s)", cluster.index, cluster.count,
+                    "leader" if cluster.is_leader else "follower")
 
     runner = web.AppRunner(app)
     await runner.setup()
     port = int(os.environ.get("PORT", 8000))
-    site = web.TCPSite(runner, "0.0.0.0", port)
+    # Semua worker mendengarkan port yang sama (SO_REUSEPORT); kernel membagi koneksinya
+    site = web.TCPSite(runner, "0.0.0.0", port, reuse_port=cluster.enabled)
     await site.start()
 
     # Agar proses tidak langsung berhenti
@@ -488,4 +2967,7 @@ async def main():
         await asyncio.sleep(3600)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if WORKERS > 1 and WORKER_INDEX is None:
+        run_supervisor()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# bot2jam.py berada di root repo, bukan paket yang terpasang
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
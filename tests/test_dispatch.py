@@ -0,0 +1,33 @@
+import datetime
+
+import pytz
+
+import bot2jam
+
+
+def utc(day, hour, minute):
+    return datetime.datetime(2026, 10, day, hour, minute, tzinfo=pytz.utc)
+
+
+def test_dispatch_keys_between_crosses_midnight(monkeypatch):
+    monkeypatch.setattr(bot2jam, "dispatch_times", [0 * 60 + 5, 12 * 60, 23 * 60 + 55])
+    assert bot2jam.dispatch_keys_between(utc(18, 23, 50), utc(19, 0, 10)) == [
+        ((23, 55), utc(18, 23, 55)),
+        ((0, 5), utc(19, 0, 5)),
+    ]
+
+
+def test_dispatch_keys_between_excludes_since_and_includes_until(monkeypatch):
+    monkeypatch.setattr(bot2jam, "dispatch_times", [0 * 60 + 5, 12 * 60, 23 * 60 + 55])
+    assert bot2jam.dispatch_keys_between(utc(18, 12, 0), utc(18, 23, 55)) == [((23, 55), utc(18, 23, 55))]
+    assert bot2jam.dispatch_keys_between(utc(18, 12, 0), utc(18, 12, 0)) == []
+
+
+def test_dispatch_keys_between_spans_whole_days(monkeypatch):
+    monkeypatch.setattr(bot2jam, "dispatch_times", [0 * 60 + 5, 12 * 60, 23 * 60 + 55])
+    assert bot2jam.dispatch_keys_between(utc(18, 12, 0), utc(20, 0, 0)) == [
+        ((23, 55), utc(18, 23, 55)),
+        ((0, 5), utc(19, 0, 5)),
+        ((12, 0), utc(19, 12, 0)),
+        ((23, 55), utc(19, 23, 55)),
+    ]
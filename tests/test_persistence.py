@@ -0,0 +1,109 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+
+import bot2jam
+
+
+def entry_bit(section, message):
+    return 1 << bot2jam.ENTRY_BY_MESSAGE[(section, message)].id
+
+
+def test_legacy_pickle_migration_converts_message_sets_to_bitmasks(tmp_path):
+    legacy_path = tmp_path / "reminder_data.pkl"
+    legacy = {
+        "bot_data": {
+            "active_sections": {10: {"Pagi": True}},
+            # Format lama: set teks pesan lintas section
+            "completed_tasks": {10: {"07:00 cek phising", "15:30 cek link", "pesan yang sudah dihapus"}},
+            "polling_offset": 5,
+        },
+        "chat_data": {10: {"catatan": 1}},
+        "user_data": {},
+        "callback_data": None,
+        "conversations": {},
+    }
+    legacy_path.write_bytes(pickle.dumps(legacy))
+
+    persistence = bot2jam.SqlitePersistence(str(tmp_path / "db.sqlite3"), legacy_pickle=str(legacy_path))
+    try:
+        bot_data = persistence._load_bot_data()
+        chat_data = persistence._load_blobs("chat_data", "chat_id")
+    finally:
+        persistence._conn.close()
+
+    generation = bot2jam.current_generation()
+    assert bot_data["active_sections"] == {10: {"Pagi": True}}
+    assert bot_data["completed_tasks"] == {10: {
+        "Pagi": (generation, entry_bit("Pagi", "07:00 cek phising")),
+        "Siang": (generation, entry_bit("Siang", "15:30 cek link")),
+    }}
+    assert bot_data["polling_offset"] == 5
+    assert chat_data == {10: {"catatan": 1}}
+    assert not legacy_path.exists()
+    assert os.path.exists(f"{legacy_path}.migrated")
+
+
+def test_old_schema_gains_generation_column_and_converts_json_rows(tmp_path):
+    path = str(tmp_path / "db.sqlite3")
+    conn = sqlite3.connect(path)
+    # Skema versi pertama: completed berupa daftar teks pesan dalam JSON, tanpa kolom generation
+    conn.executescript(
+        """
+        CREATE TABLE chat_sections (
+            chat_id INTEGER NOT NULL,
+            section TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 0,
+            completed TEXT NOT NULL DEFAULT '[]',
+            PRIMARY KEY (chat_id, section)
+        );
+        INSERT INTO chat_sections VALUES (1, 'Pagi', 1, '["07:00 cek phising"]');
+        INSERT INTO chat_sections VALUES (2, 'Malam', 1, '[]');
+        """
+    )
+    conn.close()
+
+    persistence = bot2jam.SqlitePersistence(path)
+    try:
+        bot_data = persistence._load_bot_data()
+        columns = {row[1] for row in persistence._conn.execute("PRAGMA table_info(chat_sections)")}
+    finally:
+        persistence._conn.close()
+
+    assert "generation" in columns
+    assert bot_data["active_sections"] == {1: {"Pagi": True}, 2: {"Malam": True}}
+    assert bot_data["completed_tasks"] == {
+        1: {"Pagi": (bot2jam.current_generation(), entry_bit("Pagi", "07:00 cek phising"))},
+    }
+
+
+def test_save_writes_only_dirty_rows(tmp_path):
+    path = str(tmp_path / "db.sqlite3")
+
+    async def scenario():
+        persistence = bot2jam.SqlitePersistence(path)
+        bot_data = {}
+        await persistence.attach_bot_data(bot_data)
+        for chat_id in range(1, 51):
+            bot_data["active_sections"][chat_id] = {"Pagi": True}
+            persistence.mark_dirty(chat_id, "Pagi")
+        await persistence.save_bot_data()
+
+        rows_before = persistence.rows_written
+        bot2jam.set_completed_mask(bot_data, 7, "Pagi", 0b11)
+        persistence.mark_dirty(7, "Pagi")
+        await persistence.save_bot_data()
+        rows_after_one = persistence.rows_written - rows_before
+        await persistence.flush()
+
+        reloaded = bot2jam.SqlitePersistence(path)
+        restored = {}
+        await reloaded.attach_bot_data(restored)
+        await reloaded.flush()
+        return rows_after_one, restored
+
+    rows_after_one, restored = asyncio.run(scenario())
+    assert rows_after_one == 1
+    assert len(restored["active_sections"]) == 50
+    assert restored["completed_tasks"][7]["Pagi"][1] == 0b11
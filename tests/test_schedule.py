@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import bot2jam
+
+
+def test_assign_entry_ids_keeps_known_ids_and_never_reuses_removed_ones():
+    id_map = bot2jam.assign_entry_ids({"Pagi": [(7, 0, "a"), (7, 5, "b"), (8, 0, "c")]}, {})
+    assert id_map == {"Pagi": {"a": 0, "b": 1, "c": 2}}
+
+    # "b" dihapus, "d" ditambah di depan: ID lama tetap, "d" tidak mewarisi ID 1 milik "b"
+    bot2jam.assign_entry_ids({"Pagi": [(6, 0, "d"), (7, 0, "a"), (8, 0, "c")]}, id_map)
+    assert id_map["Pagi"]["a"] == 0
+    assert id_map["Pagi"]["c"] == 2
+    assert id_map["Pagi"]["d"] == 3
+
+
+def test_assign_entry_ids_reuses_freed_ids_only_when_bits_run_out():
+    full = {"Pagi": [(0, 0, f"m{i}") for i in range(bot2jam.MAX_ENTRY_BITS)]}
+    id_map = bot2jam.assign_entry_ids(full, {})
+    full["Pagi"][5] = (0, 0, "baru")
+    bot2jam.assign_entry_ids(full, id_map)
+    assert id_map["Pagi"]["baru"] == 5
+
+    full["Pagi"].append((0, 0, "kelebihan"))
+    with pytest.raises(ValueError):
+        bot2jam.assign_entry_ids(full, id_map)
+
+
+def test_diff_schedule_keeps_ids_for_moved_and_retimed_entries():
+    old_sections = {"Pagi": [(7, 0, "07:00 cek phising"), (7, 5, "cek link"), (8, 0, "deposit")]}
+    id_map = bot2jam.assign_entry_ids(old_sections, {})
+    old_registry = bot2jam.build_entry_registry(old_sections, id_map)
+    new_sections = {
+        "Pagi": [(7, 30, "07:30 cek phising"), (9, 0, "cek link"), (10, 0, "withdraw")],
+        "Siang": [(15, 0, "cek link")],
+    }
+
+    summary = bot2jam.diff_schedule(old_registry, new_sections, id_map)
+    bot2jam.assign_entry_ids(new_sections, id_map)
+
+    # "cek link" ganti jam; "07:00 cek phising" ganti prefix jam di teksnya
+    assert summary == {"added": 2, "removed": 1, "moved": 2}
+    assert id_map["Pagi"]["07:30 cek phising"] == 0
+    assert id_map["Pagi"]["cek link"] == 1
+    assert id_map["Pagi"]["withdraw"] == 3
+    assert id_map["Siang"]["cek link"] == 0
+
+
+def test_diff_schedule_does_not_guess_between_ambiguous_renames():
+    old_sections = {"Pagi": [(7, 0, "07:00 cek"), (8, 0, "08:00 cek")]}
+    id_map = bot2jam.assign_entry_ids(old_sections, {})
+    old_registry = bot2jam.build_entry_registry(old_sections, id_map)
+
+    summary = bot2jam.diff_schedule(old_registry, {"Pagi": [(9, 0, "09:00 cek"), (10, 0, "10:00 cek")]}, id_map)
+    assert summary == {"added": 2, "removed": 2, "moved": 0}
+
+
+def write_schedule(tmp_path, content):
+    path = tmp_path / "schedules.json"
+    path.write_text(json.dumps(content))
+    return str(path)
+
+
+def test_load_schedule_file_accepts_both_entry_forms(tmp_path):
+    path = write_schedule(tmp_path, {"Pagi": [{"time": "07:05", "message": "cek link"}, [8, 0, "deposit"]]})
+    assert bot2jam.load_schedule_file(path) == {"Pagi": [(7, 5, "cek link"), (8, 0, "deposit")]}
+
+
+@pytest.mark.parametrize("content", [
+    {"Shift_1": [["08", "00", "a"]]},
+    {"x" * (bot2jam.SECTION_NAME_MAX_BYTES + 1): [[8, 0, "a"]]},
+    {"": [[8, 0, "a"]]},
+    {"Pagi": [[8, 0, "a"], [9, 0, "a"]]},
+    {"Pagi": [{"time": "24:00", "message": "a"}]},
+])
+def test_load_schedule_file_rejects_invalid_definitions(tmp_path, content):
+    with pytest.raises(ValueError):
+        bot2jam.load_schedule_file(write_schedule(tmp_path, content))